@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+""" Run several analyses over one parse of the treebank(s).
+
+    Every sentence is read once and passed to all selected analyzers
+    (see analyzers.py), so an additional statistic costs only its own
+    work, not another pass over the corpus:
+
+        python3 analyze.py -a nonproj -a wordorder --projectivized out.conllu FILE...
+"""
+
+import argparse
+import instrument
+import importlib
+import sys
+from functools import reduce
+
+import incremental
+from analyzers import ANALYZERS, Projectivize, needed_fields
+from parallel import imap_sentences
+from pipeline import BATCH
+from pseudoproj import ENCODINGS
+
+
+class ChunkAnalyzer(object):
+    """ Run all analyzers over the sentences of a chunk; picklable so
+        that chunks can be processed by worker processes. If 'emit' is
+        set (in the main process only), Analyzer.emit() is called every
+        BATCH sentences.
+    """
+
+    def __init__(self, analyzers, emit=False):
+        self.analyzers = analyzers
+        self.emit = emit
+
+    def __call__(self, sentences):
+        analyzers = self.analyzers
+        accs = [a.new() for a in analyzers]
+        for n, sent in enumerate(sentences, 1):
+            for i, a in enumerate(analyzers):
+                accs[i] = a.update(accs[i], sent)
+            if self.emit and n % BATCH == 0:
+                accs = [a.emit(acc) for a, acc in zip(analyzers, accs)]
+        return accs
+
+
+def run(paths, analyzers, jobs=1, use_cache=False):
+    """ Run 'analyzers' over the files in 'paths' and return the list of
+        their merged accumulators (in the order of 'analyzers').
+    """
+    # analyzers that modify the sentences see them after all others
+    order = sorted(range(len(analyzers)), key=lambda i: analyzers[i].modifies)
+    ordered = [analyzers[i] for i in order]
+    results = imap_sentences(paths, ChunkAnalyzer(ordered, jobs <= 1), jobs,
+                             needed_fields(ordered), use_cache)
+    # the chunks arrive in input order, so what they emit (e.g. the
+    # projectivized sentences) is written in order
+    results = ([a.emit(acc) for a, acc in zip(ordered, accs)]
+               for accs in results)
+    merged = reduce(lambda a, b: [x.merge(y, z)
+                                  for x, y, z in zip(ordered, a, b)],
+                    results)
+    accs = [None] * len(analyzers)
+    for i, acc in zip(order, merged):
+        accs[i] = acc
+    return accs
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('files', nargs='+')
+    ap.add_argument('--analyzer', '-a', action='append', default=[],
+                    help="analyzer to run (default: nonproj and wordorder)")
+    ap.add_argument('--projectivized', metavar='FILE',
+                    help="write the projectivized sentences to FILE")
+    ap.add_argument('--encoding', '-e', choices=ENCODINGS, default="head",
+                    help="label encoding of the projectivized sentences")
+    ap.add_argument('--plugin', action='append', default=[],
+                    help="module registering additional analyzers")
+    ap.add_argument('--jobs', '-j', type=int, default=1,
+                    help="number of worker processes")
+    ap.add_argument('--no-cache', action='store_true',
+                    help="parse the files instead of using the binary cache")
+    ap.add_argument('--incremental', action='store_true',
+                    help="reuse the stored results of unchanged sentences")
+    instrument.add_arguments(ap)
+    args = ap.parse_args()
+    instrument.setup(args)
+    for module in args.plugin:
+        importlib.import_module(module)
+    names = args.analyzer
+    if not names:
+        names = ["nonproj", "wordorder"]
+    if args.projectivized and "projectivize" not in names:
+        names.append("projectivize")
+    analyzers = []
+    for name in names:
+        if name not in ANALYZERS:
+            ap.error("unknown analyzer '{}' (available: {})"
+                     .format(name, ", ".join(sorted(ANALYZERS))))
+        if ANALYZERS[name] is Projectivize:
+            analyzers.append(Projectivize(args.projectivized, args.encoding))
+        else:
+            analyzers.append(ANALYZERS[name]())
+    for f in args.files:
+        assert (".conllu" in f or f == "-"), "Incorrect file! Please use a .conllu file."
+
+    if args.incremental:
+        accs = incremental.run(args.files, analyzers, log=sys.stderr)
+    else:
+        accs = run(args.files, analyzers, args.jobs, not args.no_cache)
+    for analyzer, acc in zip(analyzers, accs):
+        print("#", analyzer.name)
+        analyzer.report(acc)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+
+""" Pluggable per-sentence analyses for analyze.py.
+
+    An analyzer keeps its results in an accumulator. The runner creates
+    one accumulator per chunk of the input with new(), feeds every
+    sentence of the chunk to update(), passes the accumulators of the
+    chunks (in input order) to emit(), merges them with merge() and
+    finally calls report().
+    Accumulators must be picklable, as chunks may be processed by
+    worker processes.
+
+    'fields' lists the CoNLL-U columns an analyzer needs (see
+    conllu.FIELDS); None means it needs full conllu.Sentence objects.
+    The runner parses each sentence once, with the union of the columns
+    of all analyzers. Analyzers that modify the sentences set
+    'modifies' and are run after the others.
+
+    New analyzers are added with the register() class decorator, e.g.
+    in a module loaded with 'analyze.py --plugin MODULE':
+
+        @register
+        class Length(Analyzer):
+            name = "length"
+            fields = ("head",)
+
+            def new(self):
+                return Counter()
+
+            def update(self, acc, sent):
+                acc[len(sent)] += 1
+                return acc
+            ...
+"""
+
+import sys
+from collections import Counter
+from functools import reduce
+
+from parallel import add_counters, merge_counters
+from pipeline import write_texts
+from projectivity import crossing_pairs, graph_crossing_pairs, is_projective
+from pseudoproj import ENCODINGS, projectivize_or_skip
+from stats import COUNT_KEYS, add_word_order, print_word_order
+
+ANALYZERS = dict()
+
+
+def register(cls):
+    """ Class decorator adding an Analyzer class to ANALYZERS. """
+    ANALYZERS[cls.name] = cls
+    return cls
+
+
+class Analyzer(object):
+    """ Base class of the analyzers; the default accumulator is a Counter.
+    """
+
+    name = None
+    fields = None
+    modifies = False
+
+    def new(self):
+        return Counter()
+
+    def update(self, acc, sent):
+        raise NotImplementedError
+
+    def merge(self, a, b):
+        return merge_counters(a, b)
+
+    def merge_all(self, accs):
+        """ Merge a sequence of accumulators, e.g. one per sentence. """
+        return reduce(self.merge, accs, self.new())
+
+    def emit(self, acc):
+        """ Write out the part of 'acc' that need not be kept (e.g. the
+            text of sentences) and return the rest. The runner calls it
+            in the main process, on the accumulators of the chunks in
+            input order, before merging them.
+        """
+        return acc
+
+    def report(self, acc, out=sys.stdout):
+        for key, value in acc.items():
+            print(key, "\t", value, file=out)
+
+
+def needed_fields(analyzers):
+    """ Return the union of the columns needed by 'analyzers', or None
+        if any of them needs full sentences.
+    """
+    fields = []
+    for analyzer in analyzers:
+        if analyzer.fields is None:
+            return None
+        fields.extend(x for x in analyzer.fields if x not in fields)
+    return tuple(fields)
+
+
+@register
+class NonProjectivity(Analyzer):
+    """ Number and ratio of non-projective trees, as non-proj.py. """
+
+    name = "nonproj"
+    fields = ("head",)
+
+    def new(self):
+        return Counter(sent=0, non_proj=0)
+
+    def update(self, acc, sent):
+        acc['sent'] += 1
+        if not is_projective(sent.head()):
+            acc['non_proj'] += 1
+        return acc
+
+    def merge_all(self, accs):
+        return add_counters(self.new(), accs)
+
+    def report(self, acc, out=sys.stdout):
+        non_proj, sent = acc['non_proj'], acc['sent']
+        print("NON-PROJ", "\t", non_proj, "\t",
+              round(non_proj / sent * 100, 2) if sent else 0.0, "%", file=out)
+
+
+@register
+class Crossings(Analyzer):
+    """ Crossing arcs (without the arcs from the root): the number of
+        crossing pairs and crossed arcs, and the most frequent pairs of
+        labels of crossing arcs.
+    """
+
+    name = "crossings"
+    fields = ("head", "deprel")
+    top = 10
+
+    def new(self):
+        return Counter(sent=0, arcs=0, pairs=0, crossed=0), Counter()
+
+    def update(self, acc, sent):
+        counts, labels = acc
+        heads = sent.head()
+        pairs, crossed = crossing_pairs(heads)
+        counts['sent'] += 1
+        counts['arcs'] += sum(1 for h in heads if h != 0)
+        counts['pairs'] += len(pairs)
+        counts['crossed'] += len(crossed) - crossed.count(0)
+        if pairs:
+            deprels = sent.deprel()
+            for a, b in pairs:
+                labels[tuple(sorted((deprels[a - 1], deprels[b - 1])))] += 1
+        return acc
+
+    def merge_all(self, accs):
+        return add_counters(self.new(), accs)
+
+    def report(self, acc, out=sys.stdout):
+        counts, labels = acc
+        sent, arcs = counts['sent'], counts['arcs']
+        print("CROSSING-PAIRS", "\t", counts['pairs'], "\t",
+              round(counts['pairs'] / sent, 4) if sent else 0.0,
+              "per sentence", file=out)
+        print("CROSSED-ARCS", "\t", counts['crossed'], "\t",
+              round(counts['crossed'] / arcs * 100, 2) if arcs else 0.0, "%",
+              file=out)
+        for (a, b), n in labels.most_common(self.top):
+            print(a, b, "\t", n, file=out)
+
+
+@register
+class Enhanced(Analyzer):
+    """ Crossing arcs in the enhanced graphs (DEPS column, with empty
+        nodes), without the arcs from the root.
+    """
+
+    name = "enhanced"
+    fields = None
+
+    def new(self):
+        return Counter(sent=0, non_proj=0, nodes=0, empty=0, multi_head=0,
+                       arcs=0, pairs=0, crossed=0)
+
+    def update(self, acc, sent):
+        graph = sent.enhanced()
+        pairs, crossed = graph_crossing_pairs(graph)
+        acc['sent'] += 1
+        acc['nodes'] += len(graph)
+        acc['empty'] += sum(1 for x in graph.ids if '.' in x)
+        offsets = graph.offsets
+        acc['multi_head'] += sum(1 for i in range(len(graph))
+                                 if offsets[i + 1] - offsets[i] > 1)
+        acc['arcs'] += sum(1 for h in graph.head if h != 0)
+        acc['pairs'] += len(pairs)
+        acc['crossed'] += sum(1 for x in crossed if x)
+        if pairs:
+            acc['non_proj'] += 1
+        return acc
+
+    def merge_all(self, accs):
+        return add_counters(self.new(), accs)
+
+    def report(self, acc, out=sys.stdout):
+        def ratio(a, b):
+            return round(acc[a] / acc[b] * 100, 2) if acc[b] else 0.0
+        print("NON-PROJ", "\t", acc['non_proj'], "\t",
+              ratio('non_proj', 'sent'), "%", file=out)
+        print("CROSSING-PAIRS", "\t", acc['pairs'], file=out)
+        print("CROSSED-ARCS", "\t", acc['crossed'], "\t",
+              ratio('crossed', 'arcs'), "%", file=out)
+        print("EMPTY-NODES", "\t", acc['empty'], "\t",
+              ratio('empty', 'nodes'), "%", file=out)
+        print("MULTI-HEAD", "\t", acc['multi_head'], "\t",
+              ratio('multi_head', 'nodes'), "%", file=out)
+
+
+@register
+class WordOrder(Analyzer):
+    """ Subject, object and verb orders, as stats.py. """
+
+    name = "wordorder"
+    fields = ("head", "deprel", "upos")
+
+    def new(self):
+        return Counter({k: 0 for k in COUNT_KEYS}), Counter()
+
+    def update(self, acc, sent):
+        add_word_order(sent, acc[0], acc[1])
+        return acc
+
+    def merge_all(self, accs):
+        return add_counters(self.new(), accs)
+
+    def report(self, acc, out=sys.stdout):
+        print_word_order(acc[0], acc[1], out)
+
+
+@register
+class Projectivize(Analyzer):
+    """ Pseudo-projectivized non-projective sentences, as pseudo-proj.py.
+        The accumulator is a Counter of the sentences, the projectivized
+        ones and the skipped ones (not trees), with the CoNLL-U text of
+        the projectivized sentences of the current chunk; emit() writes
+        the text to 'output' (a file name, or standard output if None),
+        so memory does not grow with the treebank.
+    """
+
+    name = "projectivize"
+    fields = None
+    modifies = True
+
+    def __init__(self, output=None, encoding="head"):
+        if encoding not in ENCODINGS:
+            raise ValueError("Unknown encoding: {}".format(encoding))
+        self.output = output
+        self.encoding = encoding
+        self._out = None
+
+    def __getstate__(self):
+        # the output file stays in the main process
+        state = dict(vars(self))
+        state['_out'] = None
+        return state
+
+    def _file(self):
+        if self._out is None:
+            self._out = (sys.stdout if self.output is None
+                         else open(self.output, 'w'))
+        return self._out
+
+    def new(self):
+        return Counter(sent=0, non_proj=0, skipped=0), []
+
+    def update(self, acc, sent):
+        counts, texts = acc
+        counts['sent'] += 1
+        changed = projectivize_or_skip(sent, self.encoding)
+        if changed:
+            counts['non_proj'] += 1
+            texts.append(str(sent) + "\n")
+        elif changed is None:
+            counts['skipped'] += 1
+        return acc
+
+    def emit(self, acc):
+        counts, texts = acc
+        if texts:
+            write_texts(texts, self._file())
+        return counts, []
+
+    def merge(self, a, b):
+        return merge_counters(a[0], b[0]), a[1] + b[1]
+
+    def report(self, acc, out=sys.stdout):
+        counts, _ = self.emit(acc)
+        fp = self._file()
+        if fp is not sys.stdout:
+            fp.close()
+        self._out = None
+        non_proj, sent = counts['non_proj'], counts['sent']
+        print("PROJECTIVIZED", "\t", non_proj, "\t",
+              round(non_proj / sent * 100, 2) if sent else 0.0, "%", file=out)
+        print("SKIPPED", "\t", counts['skipped'], file=out)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+""" Non-projectivity and word order of many treebanks in one run.
+
+    The treebanks are given as files, directories (searched recursively
+    for .conllu files, also compressed) or glob patterns. All of them
+    share one pool of worker processes; the largest files are scheduled
+    first, so that the workers finish at about the same time. On the
+    first run the workers parse the files and save their binary caches
+    (see cache.py and parallel.imap_files()); later runs read the caches.
+    The results are summed per language (or per file) and printed as one
+    table, as TSV or JSON:
+
+        python3 batch.py --jobs 8 ud-treebanks-v2.12/ > summary.tsv
+        python3 batch.py --format json "12.1/*.conllu"
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+from analyze import ChunkAnalyzer
+from analyzers import NonProjectivity, WordOrder, needed_fields
+from parallel import map_reduce_files
+from stats import SOV_ORDERS, language, percent
+from streams import COMPRESSED, is_stream
+
+SUFFIXES = (".conllu",) + tuple(".conllu" + x for x in COMPRESSED)
+COLUMNS = (("group", "files", "sentences", "non_proj", "non_proj%",
+            "verbs", "with_s", "with_o", "with_so") +
+           tuple(x + "%" for x in SOV_ORDERS + ("SV", "VS", "OV", "VO")))
+
+
+def find_treebanks(specs):
+    """ Return the treebank files of 'specs' (files, directories or glob
+        patterns), without duplicates.
+    """
+    paths = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            for root, dirs, files in os.walk(spec):
+                dirs.sort()
+                paths.extend(os.path.join(root, f) for f in sorted(files)
+                             if f.endswith(SUFFIXES))
+        elif glob.has_magic(spec):
+            paths.extend(sorted(glob.glob(spec, recursive=True)))
+        else:
+            paths.append(spec)
+    return list(dict.fromkeys(paths))
+
+
+def largest_first(paths):
+    """ Sort 'paths' by decreasing file size (standard input last). """
+    return sorted(paths, key=lambda p: 0 if p == "-" else os.path.getsize(p),
+                  reverse=True)
+
+
+def run(paths, jobs=1, use_cache=True):
+    """ Return a dictionary of path to the (nonproj, wordorder)
+        accumulators of the file (see analyzers.py).
+    """
+    analyzers = [NonProjectivity(), WordOrder()]
+
+    def merge(a, b):
+        return [x.merge(y, z) for x, y, z in zip(analyzers, a, b)]
+
+    return map_reduce_files(largest_first(paths), ChunkAnalyzer(analyzers),
+                            merge, jobs, needed_fields(analyzers), use_cache)
+
+
+def summary(results, by="language"):
+    """ Sum the results of run() per language (or per file) and return
+        one row (a dictionary with the keys of COLUMNS) per group, and
+        a row for all groups if there are several.
+    """
+    groups = dict()
+    for path in sorted(results, key=language if by == "language" else str):
+        name = language(path) if by == "language" else path
+        groups.setdefault(name, []).append(results[path])
+    if len(groups) > 1:
+        groups["all"] = [r for rs in groups.values() for r in rs]
+    rows = []
+    for name, accs in groups.items():
+        nonproj = NonProjectivity().merge_all(acc[0] for acc in accs)
+        counts, sov = WordOrder().merge_all(acc[1] for acc in accs)
+        values = [name, len(accs), nonproj['sent'], nonproj['non_proj'],
+                  percent(nonproj['non_proj'], nonproj['sent']),
+                  counts["v_as_root"], counts["with_s"], counts["with_o"],
+                  counts["with_so"]]
+        values.extend(percent(sov[x], counts["with_so"]) for x in SOV_ORDERS)
+        values.extend(percent(counts[x], counts["with_s"])
+                      for x in ("SV", "VS"))
+        values.extend(percent(counts[x], counts["with_o"])
+                      for x in ("OV", "VO"))
+        rows.append(dict(zip(COLUMNS, values)))
+    return rows
+
+
+def print_tsv(rows, out=sys.stdout):
+    print("\t".join(COLUMNS), file=out)
+    for row in rows:
+        print("\t".join(str(row[x]) for x in COLUMNS), file=out)
+
+
+def print_json(rows, out=sys.stdout):
+    json.dump(rows, out, indent=2)
+    print(file=out)
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('treebanks', nargs='+',
+                    help="treebank files, directories or glob patterns")
+    ap.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1,
+                    help="number of worker processes (default: all cores)")
+    ap.add_argument('--no-cache', action='store_true',
+                    help="parse the files instead of using the binary cache")
+    ap.add_argument('--by', choices=("language", "file"), default="language",
+                    help="one row per language or per file")
+    ap.add_argument('--format', '-f', choices=("tsv", "json"), default="tsv")
+    args = ap.parse_args()
+    paths = find_treebanks(args.treebanks)
+    if not paths:
+        sys.exit("Error: no treebanks found!")
+    for path in paths:
+        assert(os.path.isfile(path) or is_stream(path)), \
+            "Error: {} does not exist!".format(path)
+
+    results = run(paths, args.jobs, not args.no_cache)
+    rows = summary(results, args.by)
+    if args.format == "json":
+        print_json(rows)
+    else:
+        print_tsv(rows)
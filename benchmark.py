@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+
+""" Benchmarks of the parsing, serialization and projectivity code.
+
+    Every benchmark is run on a synthetic treebank (see synthetic.py) or
+    on the files given as arguments, and reports the best time of
+    '--repeat' runs as sentences and tokens per second. The peak memory
+    allocated by a benchmark is measured in a separate run with
+    tracemalloc. With '--json FILE' the results are saved, together with
+    the corpus parameters and the current git commit, and '--compare
+    FILE' prints the speed relative to earlier saved results:
+
+        python3 benchmark.py --sentences 20000 --json base.json
+        (change something)
+        python3 benchmark.py --sentences 20000 --compare base.json
+"""
+
+import argparse
+import importlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import synthetic
+from conllu import (conllu_columns, conllu_enhanced, conllu_sentences,
+                    write_conllu)
+from projectivity import graph_is_projective
+
+non_proj = importlib.import_module("non-proj")
+pseudo_proj = importlib.import_module("pseudo-proj")
+
+
+def bench_parse(paths):
+    """ conllu_sentences() """
+    def run():
+        for path in paths:
+            for _ in conllu_sentences(path):
+                pass
+    return None, run
+
+
+def bench_parse_lazy(paths):
+    """ conllu_sentences() with lazy nodes """
+    def run():
+        for path in paths:
+            for _ in conllu_sentences(path, lazy=True):
+                pass
+    return None, run
+
+
+def bench_columns(paths):
+    """ conllu_columns() with HEAD, DEPREL and UPOS """
+    def run():
+        for path in paths:
+            for _ in conllu_columns(path):
+                pass
+    return None, run
+
+
+def _load(paths):
+    return [s for path in paths for s in conllu_sentences(path)]
+
+
+def bench_serialize(paths):
+    """ Sentence.__str__ """
+    def run(sentences):
+        for s in sentences:
+            str(s)
+    return _load, run
+
+
+def bench_write(paths):
+    """ write_conllu() to memory """
+    def run(sentences):
+        write_conllu(sentences, io.StringIO())
+    return _load, run
+
+
+def bench_non_proj(paths):
+    """ is_non_proj() from non-proj.py """
+    def run(sentences):
+        for s in sentences:
+            non_proj.is_non_proj(s)
+    return _load, run
+
+
+def bench_projectivize(paths, encoding="head"):
+    """ pseudo-projectivization loop of pseudo-proj.py """
+    def run(sentences):
+        for _ in pseudo_proj.projectivized(sentences, encoding):
+            pass
+    return _load, run
+
+
+def bench_enhanced(paths):
+    """ conllu_enhanced() and graph_is_projective() """
+    def run():
+        for path in paths:
+            for graph in conllu_enhanced(path):
+                graph_is_projective(graph)
+    return None, run
+
+
+BENCHMARKS = {
+    "parse": bench_parse,
+    "parse-lazy": bench_parse_lazy,
+    "columns": bench_columns,
+    "serialize": bench_serialize,
+    "write": bench_write,
+    "non-proj": bench_non_proj,
+    "projectivize": bench_projectivize,
+    "enhanced": bench_enhanced,
+}
+
+
+def corpus_size(paths):
+    sentences = tokens = 0
+    for path in paths:
+        for s in conllu_columns(path, ("head",)):
+            sentences += 1
+            tokens += len(s)
+    return sentences, tokens
+
+
+def measure(benchmark, paths, repeat=3, memory=True):
+    """ Run a benchmark 'repeat' times; return the best time in seconds
+        and the peak traced memory in bytes (None if not measured). The
+        setup (e.g. parsing the input of the serializer) is not timed,
+        and is repeated before every run, as a run may modify its input.
+    """
+    setup, run = benchmark(paths)
+    best = None
+    for _ in range(repeat):
+        args = (setup(paths),) if setup else ()
+        start = time.perf_counter()
+        run(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+        del args
+    peak = None
+    if memory:
+        args = (setup(paths),) if setup else ()
+        tracemalloc.start()
+        run(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+            cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(paths, names, repeat=3, memory=True, log=sys.stderr):
+    sentences, tokens = corpus_size(paths)
+    results = dict()
+    for name in names:
+        seconds, peak = measure(BENCHMARKS[name], paths, repeat, memory)
+        results[name] = dict(
+            seconds=round(seconds, 6),
+            sentences_per_s=round(sentences / seconds, 1),
+            tokens_per_s=round(tokens / seconds, 1),
+            peak_kib=None if peak is None else peak // 1024)
+        if log is not None:
+            print(".", end="", file=log, flush=True)
+    if log is not None:
+        print(file=log)
+    return dict(sentences=sentences, tokens=tokens, results=results)
+
+
+def print_results(report, baseline=None, out=sys.stdout):
+    header = ["benchmark", "seconds", "sent/s", "tokens/s", "peak KiB"]
+    if baseline is not None:
+        header.append("speedup")
+    print("\t".join(header), file=out)
+    for name, r in report["results"].items():
+        row = [name, r["seconds"], r["sentences_per_s"], r["tokens_per_s"],
+               "-" if r["peak_kib"] is None else r["peak_kib"]]
+        if baseline is not None:
+            old = baseline["results"].get(name)
+            row.append(round(old["seconds"] / r["seconds"], 2) if old
+                       else "-")
+        print("\t".join(str(x) for x in row), file=out)
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    ap.add_argument('files', nargs='*',
+                    help="treebanks to use instead of a synthetic one")
+    synthetic.add_arguments(ap)
+    ap.add_argument('--benchmark', '-b', action='append',
+                    choices=sorted(BENCHMARKS),
+                    help="benchmark to run (default: all)")
+    ap.add_argument('--repeat', '-r', type=int, default=3)
+    ap.add_argument('--no-memory', action='store_true',
+                    help="do not measure peak memory")
+    ap.add_argument('--json', metavar='FILE', help="save the results")
+    ap.add_argument('--compare', metavar='FILE',
+                    help="compare with results saved with --json")
+    args = ap.parse_args()
+
+    names = args.benchmark or list(BENCHMARKS)
+    tmp = None
+    if args.files:
+        paths = args.files
+        corpus = dict(files=paths)
+    else:
+        corpus = synthetic.parameters(args)
+        fd, tmp = tempfile.mkstemp(suffix=".conllu")
+        with os.fdopen(fd, 'w') as fp:
+            synthetic.write(fp, **corpus)
+        paths = [tmp]
+    try:
+        report = run_benchmarks(paths, names, args.repeat, not args.no_memory)
+    finally:
+        if tmp is not None:
+            os.remove(tmp)
+    report = dict(commit=git_commit(), python=platform.python_version(),
+                  time=time.strftime("%Y-%m-%dT%H:%M:%S"), corpus=corpus,
+                  repeat=args.repeat, **report)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)
+        if baseline.get("corpus") != corpus:
+            print("warning: the corpus differs from that of", args.compare,
+                  file=sys.stderr)
+    print_results(report, baseline)
+    if args.json:
+        with open(args.json, 'w') as fp:
+            json.dump(report, fp, indent=2)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+""" Binary cache of the tree columns of treebanks.
+
+    load(path) returns a columnar.Corpus with the HEAD, UPOS and DEPREL
+    columns of a CoNLL-U file. The first time, the file is parsed and
+    the corpus is saved in the cache directory; later calls read the
+    arrays back directly, which takes milliseconds instead of a full
+    parse. A cache file is keyed by the absolute path of the treebank
+    and records its size and modification time; it is rebuilt when
+    they change.
+
+    The cache directory is $UD_CACHE_DIR, or ~/.cache/ud-projectivity.
+
+    File layout: a header line, the vocabulary (one string per line),
+    the sent_ids (one per line, '_' for none), followed by the raw
+    offsets, head, upos and deprel arrays.
+"""
+
+import hashlib
+import os
+import sys
+from array import array
+
+from columnar import Corpus, Vocabulary, load as load_corpus
+from streams import is_stream
+
+MAGIC = "ud-projectivity-cache"
+VERSION = 1
+
+
+def cache_dir():
+    return os.environ.get("UD_CACHE_DIR",
+                          os.path.join(os.path.expanduser("~"), ".cache",
+                                       "ud-projectivity"))
+
+
+def cache_file(path):
+    """ Return the name of the cache file of treebank 'path'. """
+    key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir(), key + ".bin")
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def write_cache(corpus, path):
+    """ Save 'corpus', read from treebank 'path', in the cache. The file
+        is written under a temporary name and renamed, so concurrent
+        readers never see a partial file.
+    """
+    target = cache_file(path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    size, mtime = _stamp(path)
+    arrays = (corpus.offsets, corpus.head, corpus.upos, corpus.deprel)
+    header = [MAGIC, VERSION, sys.byteorder, size, mtime,
+              len(corpus.vocab), len(corpus.sent_ids)]
+    header.extend(x.typecode + str(len(x)) for x in arrays)
+    tmp = "{}.{}.tmp".format(target, os.getpid())
+    with open(tmp, 'wb') as fp:
+        lines = [" ".join(str(x) for x in header)]
+        lines.extend(corpus.vocab.strings)
+        lines.extend('_' if x is None else x for x in corpus.sent_ids)
+        lines.append("")
+        fp.write("\n".join(lines).encode('utf-8'))
+        for x in arrays:
+            x.tofile(fp)
+    os.replace(tmp, target)
+
+
+def _read_header(fp, path):
+    """ Read the header line of cache file 'fp'; return it as a list, or
+        None if it is not the up-to-date cache of treebank 'path'.
+    """
+    header = fp.readline().decode('utf-8').split()
+    if header[:2] != [MAGIC, str(VERSION)] or \
+            (int(header[3]), int(header[4])) != _stamp(path):
+        return None
+    return header
+
+
+def cached_length(path):
+    """ Return the number of sentences of treebank 'path' from the header
+        of its cache file, or None if it is not cached or the cache is
+        out of date.
+    """
+    try:
+        fp = open(cache_file(path), 'rb')
+    except OSError:
+        return None
+    with fp:
+        header = _read_header(fp, path)
+    return None if header is None else int(header[6])
+
+
+def read_cache(path):
+    """ Return the cached Corpus of treebank 'path', or None if it is
+        not cached or the cache is out of date.
+    """
+    try:
+        fp = open(cache_file(path), 'rb')
+    except OSError:
+        return None
+    with fp:
+        header = _read_header(fp, path)
+        if header is None:
+            return None
+        byteorder = header[2]
+        nvocab, nsent = int(header[5]), int(header[6])
+        corpus = Corpus(Vocabulary())
+        for _ in range(nvocab):
+            corpus.vocab.code(fp.readline().decode('utf-8').rstrip('\n'))
+        sent_ids = []
+        for _ in range(nsent):
+            sent_id = fp.readline().decode('utf-8').rstrip('\n')
+            sent_ids.append(None if sent_id == '_' else sent_id)
+        corpus.sent_ids = sent_ids
+        for name, spec in zip(("offsets", "head", "upos", "deprel"),
+                              header[7:11]):
+            values = array(spec[0])
+            values.fromfile(fp, int(spec[1:]))
+            if byteorder != sys.byteorder:
+                values.byteswap()
+            setattr(corpus, name, values)
+    return corpus
+
+
+def load(path, use_cache=True):
+    """ Return the Corpus of treebank 'path', from the cache if possible.
+        With use_cache=False, or if 'path' is a stream (standard input
+        or a compressed file), the file is parsed and the cache is
+        neither read nor written.
+    """
+    if not use_cache or is_stream(path):
+        return load_corpus(path)
+    corpus = read_cache(path)
+    if corpus is None:
+        corpus = load_corpus(path)
+        write_cache(corpus, path)
+    return corpus
+
+
+if __name__ == '__main__':
+    # (Re)build the cache of the files given as arguments.
+    for path in sys.argv[1:]:
+        corpus = load_corpus(path)
+        write_cache(corpus, path)
+        print(cache_file(path), "\t", len(corpus))
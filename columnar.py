@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+""" Compact, array-backed storage of the tree columns of a treebank.
+
+    A Corpus keeps the HEAD column of all sentences in one array('i'),
+    and UPOS and DEPREL as small integer codes (array('H')) into a
+    Vocabulary that can be shared between corpora. Sentence boundaries
+    are kept as offsets into these token columns. This takes a few
+    bytes per token instead of a Node object with a dozen attributes,
+    so that whole treebanks can be kept in memory.
+"""
+
+from array import array
+
+from conllu import conllu_columns
+
+COLUMNS = ("head", "upos", "deprel")
+
+
+class Vocabulary(object):
+    """ Bidirectional mapping between strings and small integer codes.
+    """
+
+    __slots__ = ('strings', 'codes')
+
+    def __init__(self):
+        self.strings = []
+        self.codes = dict()
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, code):
+        return self.strings[code]
+
+    def __contains__(self, string):
+        return string in self.codes
+
+    def code(self, string):
+        """ Return the code of 'string', adding it if it is new.
+        """
+        code = self.codes.get(string)
+        if code is None:
+            code = len(self.strings)
+            self.codes[string] = code
+            self.strings.append(string)
+        return code
+
+    def encode(self, strings):
+        return [self.code(x) for x in strings]
+
+    def decode(self, codes):
+        strings = self.strings
+        return [strings[x] for x in codes]
+
+
+class CorpusSentence(object):
+    """ A view of one sentence of a Corpus.
+
+        head(), upos_codes() and deprel_codes() return memoryview slices
+        of the corpus arrays without copying; upos() and deprel() decode
+        the codes to strings. With an index (starting from 1) all of
+        them return the value for a single word, as in conllu.Sentence.
+    """
+
+    __slots__ = ('corpus', 'start', 'end', 'number')
+
+    def __init__(self, corpus, number):
+        self.corpus = corpus
+        self.number = number
+        self.start = corpus.offsets[number]
+        self.end = corpus.offsets[number + 1]
+
+    def __len__(self):
+        return self.end - self.start
+
+    def _column(self, name, index):
+        column = self.corpus.views[name]
+        if index:
+            return column[self.start + index - 1]
+        return column[self.start:self.end]
+
+    def head(self, index=None):
+        return self._column("head", index)
+
+    def upos_codes(self, index=None):
+        return self._column("upos", index)
+
+    def deprel_codes(self, index=None):
+        return self._column("deprel", index)
+
+    def upos(self, index=None):
+        vocab = self.corpus.vocab
+        if index:
+            return vocab[self.upos_codes(index)]
+        return vocab.decode(self.upos_codes())
+
+    def pos(self, index=None):
+        """Alternative spelling"""
+        return self.upos(index)
+
+    def deprel(self, index=None):
+        vocab = self.corpus.vocab
+        if index:
+            return vocab[self.deprel_codes(index)]
+        return vocab.decode(self.deprel_codes())
+
+    @property
+    def sent_id(self):
+        return self.corpus.sent_ids[self.number]
+
+
+class Corpus(object):
+    """ The HEAD, UPOS and DEPREL columns of a sequence of sentences.
+            head     - array('i') of heads of all words
+            upos     - array('H') of UPOS codes
+            deprel   - array('H') of DEPREL codes
+            offsets  - array('l'); the words of sentence i are at
+                       positions offsets[i]:offsets[i + 1] of the columns
+            sent_ids - list of sentence ids (None if there was none)
+            vocab    - Vocabulary of the UPOS and DEPREL codes
+    """
+
+    __slots__ = ('head', 'upos', 'deprel', 'offsets', 'sent_ids',
+                 'vocab', '_views')
+
+    def __init__(self, vocab=None):
+        self.head = array('i')
+        self.upos = array('H')
+        self.deprel = array('H')
+        self.offsets = array('l', [0])
+        self.sent_ids = []
+        self.vocab = Vocabulary() if vocab is None else vocab
+        self._views = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, number):
+        if number < 0:
+            number += len(self)
+        if not 0 <= number < len(self):
+            raise IndexError("sentence index out of range")
+        return CorpusSentence(self, number)
+
+    def __iter__(self):
+        for number in range(len(self)):
+            yield CorpusSentence(self, number)
+
+    @property
+    def views(self):
+        """ Read-only memoryviews of the token columns. They are created
+            once the corpus is complete, since an array cannot be resized
+            while a view of it exists.
+        """
+        if self._views is None:
+            self._views = {name: memoryview(getattr(self, name)).toreadonly()
+                           for name in COLUMNS}
+        return self._views
+
+    def append(self, sent):
+        """ Add a sentence; anything with head(), upos() and deprel()
+            accessors will do (conllu.Sentence, conllu.SentenceColumns).
+        """
+        if self._views is not None:
+            for view in self._views.values():
+                view.release()
+            self._views = None
+        vocab = self.vocab
+        self.head.extend(sent.head())
+        self.upos.extend(vocab.encode(sent.upos()))
+        self.deprel.extend(vocab.encode(sent.deprel()))
+        self.offsets.append(len(self.head))
+        sent_id = None
+        for line in getattr(sent, 'comment', ()):
+            if line.startswith('# sent_id'):
+                sent_id = line.split('=', 1)[1].strip()
+                break
+        self.sent_ids.append(sent_id)
+
+    def extend(self, sentences):
+        for sent in sentences:
+            self.append(sent)
+
+    def nbytes(self):
+        """ Return the size of the token columns and offsets in bytes.
+        """
+        return sum(x.itemsize * len(x) for x in
+                   (self.head, self.upos, self.deprel, self.offsets))
+
+
+def load(paths, vocab=None):
+    """ Read the CoNLL-U file(s) in 'paths' into a single Corpus.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    corpus = Corpus(vocab)
+    for path in paths:
+        corpus.extend(conllu_columns(path, COLUMNS))
+    return corpus
@@ -1,6 +1,13 @@
 #!/usr/bin/env python3
 
+import asyncio
+import codecs
+import re
 import sys
+import threading
+from itertools import islice
+
+from streams import open_input
 
 """ Utilities for reading/writing CoNLL-U dependency treebanks.
 """
@@ -44,10 +51,16 @@ class Node(object):
     @classmethod
     def from_str(cls, s):
         columns = s.rstrip().split("\t")
+        if len(columns) == 10: # intern UPOS, XPOS, FEATS and DEPREL
+            intern = sys.intern
+            columns[3] = intern(columns[3])
+            columns[4] = intern(columns[4])
+            columns[5] = intern(columns[5])
+            columns[7] = intern(columns[7])
         if '-' in columns[0]:
             begin, end = columns[0].split('-')
             return cls(index=begin, form=columns[1],
-                    misc=columns[8], multi=end)
+                    misc=columns[9], multi=end)
         elif '.' in columns[0]:
             empty_id = columns[0].split('.')
             part1, part2 = columns[0].split('.')
@@ -56,15 +69,23 @@ class Node(object):
             return cls(*columns)
 
     def __str__(self):
-        fields = [str(getattr(self, x)) for x in self.__slots__[1:10]]
-        idx = str(self.index)
+        """ Return the CoNLL-U line (without the newline). Missing values
+            (None or empty) are written as '_', field by field.
+        """
         if self.multi:
-            idx = "-".join((str(self.index), str(self.multi)))
+            idx = "%d-%d" % (self.index, self.multi)
         elif self.empty:
-            idx = ".".join((str(self.index), str(self.empty)))
-        return (("\t".join([idx] + fields))
-                        .replace('None', '_')
-                        .replace('[]', '_'))
+            idx = "%d.%d" % (self.index, self.empty)
+        else:
+            idx = str(self.index)
+        head = self.head
+        return "\t".join((idx, self.form or '_', self.lemma or '_',
+                          self.upos or '_', self.xpos or '_',
+                          self.feats or '_',
+                          '_' if head is None else str(head),
+                          self.deprel or '_', self.deps or '_',
+                          self.misc or '_'))
+
     def set_head(self, new_head):
         self.head = new_head
 
@@ -72,6 +93,101 @@ class Node(object):
         old_deprel = self.deprel
         self.deprel = ".".join((new_deprel, old_deprel))
 
+def _optional(value):
+    return None if not value or value == '_' else value
+
+def _lazy_lemma(columns):
+    lemma = columns[2]
+    if not lemma or (lemma == '_' and columns[3] != 'PUNCT'):
+        return None
+    return lemma
+
+def _lazy_head(columns):
+    head = columns[6]
+    return None if not head or head == '_' else int(head)
+
+# how LazyNode computes an attribute from the columns of its line; UPOS,
+# XPOS, FEATS and DEPREL are interned as in Node.from_str()
+_LAZY_FIELDS = {
+    "index": lambda c: int(c[0]),
+    "form": lambda c: c[1],
+    "lemma": _lazy_lemma,
+    "upos": lambda c: sys.intern(c[3]),
+    "xpos": lambda c: _optional(sys.intern(c[4])),
+    "feats": lambda c: _optional(sys.intern(c[5])),
+    "head": _lazy_head,
+    "deprel": lambda c: sys.intern(c[7]),
+    "deps": lambda c: _optional(c[8]),
+    "misc": lambda c: _optional(c[9]),
+    "multi": lambda c: 0,
+    "empty": lambda c: 0,
+}
+
+class LazyNode(object):
+    """ A word of the primary tree that keeps only its CoNLL-U line.
+        The attributes of Node are computed from the columns of the line
+        whenever they are read; the line is split on the first read, so
+        a node that is never looked at costs one string. The first
+        assignment to an attribute parses all columns into a dictionary
+        and drops the line; as long as the line is kept, str() returns
+        it unchanged.
+    """
+
+    __slots__ = ('_line', '_columns', '_values')
+
+    def __init__(self, line):
+        object.__setattr__(self, '_line', line)
+        object.__setattr__(self, '_columns', None)
+        object.__setattr__(self, '_values', None)
+
+    def _split(self):
+        columns = self._columns
+        if columns is None:
+            columns = self._line.split("\t")
+            object.__setattr__(self, '_columns', columns)
+        return columns
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._values is not None:
+            try:
+                return self._values[name]
+            except KeyError:
+                raise AttributeError(name) from None
+        try:
+            parse = _LAZY_FIELDS[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return parse(self._split())
+
+    def __setattr__(self, name, value):
+        if name in LazyNode.__slots__: # e.g. when unpickling
+            object.__setattr__(self, name, value)
+            return
+        if name not in _LAZY_FIELDS:
+            raise AttributeError(name)
+        if self._values is None:
+            columns = self._split()
+            object.__setattr__(self, '_values', {
+                field: parse(columns)
+                for field, parse in _LAZY_FIELDS.items()})
+            object.__setattr__(self, '_line', None)
+            object.__setattr__(self, '_columns', None)
+        self._values[name] = value
+
+    def __str__(self):
+        if self._line is not None:
+            return self._line
+        return Node.__str__(self)
+
+    set_head = Node.set_head
+    set_deprel = Node.set_deprel
+
+
+# the ID of a multi-word token or an empty node
+_SPECIAL_ID = re.compile(r"^[0-9]+[-.]", re.M)
+
 class Sentence(object):
     """ Holds a CoNLL-U sentence.
         Attributes:
@@ -86,26 +202,48 @@ class Sentence(object):
 
     __slots__ = ('nodes', 'empty', 'multi', 'comment')
 
-    def __init__(self, instr=None, stream=None):
+    def __init__(self, instr=None, stream=None, lazy=False):
         self.nodes = [Node(index=0)] # initialize with the dummy root node
         self.multi = dict()
         self.empty = dict()
         self.comment = []
 
+        inp_str = instr or ""
         if stream:
             inp_str = self.read_sentence(stream)
-        self.from_str(inp_str)
+        self.from_str(inp_str, lazy)
 
     def __len__(self):
         return len(self.nodes) - 1
 
-    def from_str(self, lines):
+    def from_str(self, lines, lazy=False):
+        """ Add the nodes and comments of CoNLL-U text. With 'lazy', the
+            words of the primary tree are LazyNodes.
+        """
+        if lazy and not _SPECIAL_ID.search(lines):
+            # no multi-word tokens or empty nodes: all lines after the
+            # comments are words
+            lines = lines.splitlines()
+            start = 0
+            while start < len(lines) and lines[start].startswith('#'):
+                start += 1
+            self.comment.extend(lines[:start])
+            words = lines[start:]
+            assert not any(x.startswith('#') for x in words),\
+                   "Comments are allowed only at the beginning"
+            self.nodes.extend([LazyNode(x.rstrip()) for x in words])
+            return
         for line in lines.splitlines():
             if line.startswith('#'):
                 assert len(self.nodes) == 1,\
                        "Comments are allowed only at the beginning"
                 self.comment.append(line)
             else:
+                if lazy:
+                    idx = line[:line.find('\t')]
+                    if '-' not in idx and '.' not in idx:
+                        self.nodes.append(LazyNode(line.rstrip()))
+                        continue
                 node = Node.from_str(line)
                 if node.multi:
                     self.multi[node.index] = node
@@ -121,23 +259,36 @@ class Sentence(object):
             The returned list of strings includes pre-sentence comment(s).
             The final empty line is read, but not added to the return value.
         """
-        lines = ""
+        lines = []
         line = stream.readline()
         while line and not line.isspace():
-            lines += line
+            lines.append(line)
             line = stream.readline()
+        return "".join(lines)
+
+    def lines(self):
+        """ Return the CoNLL-U lines of the sentence as a list of strings
+            without newlines: comments, then the words with multi-word
+            tokens before and empty nodes after the word they belong to.
+        """
+        lines = list(self.comment)
+        multi, empty = self.multi, self.empty
+        if not multi and not empty:
+            lines.extend([str(node) for node in self.nodes[1:]])
+            return lines
+        for i in range(0, len(self) + 1):
+            if i in multi:
+                lines.append(str(multi[i]))
+            if i:
+                lines.append(str(self.nodes[i]))
+            if i in empty:
+                lines.extend([str(e) for e in empty[i]])
         return lines
 
     def __str__(self):
-        s = "\n".join(self.comment) + "\n"
-        for i in range(1, len(self) + 1):
-            if i in self.multi:
-                s += str(self.multi[i]) + "\n"
-            s += str(self.nodes[i]) + "\n"
-            if self.empty and i in self.empty:
-                for e in self.empty[i]:
-                    s += str(e) + "\n"
-        return s
+        lines = self.lines()
+        lines.append("")
+        return "\n".join(lines)
 
     def form(self, index=None):
         if index:
@@ -219,17 +370,480 @@ class Sentence(object):
         else:
             return [x.misc for x in self.nodes[1:]]
 
-def conllu_sentences(f):
+    def tree(self):
+        """ Return a TreeIndex of the current heads. """
+        return TreeIndex(self.head())
+
+    def enhanced(self):
+        """ Return the EnhancedGraph of the DEPS column, including the
+            empty nodes. The column is only parsed here.
+        """
+        nodes = list(self.empty.get(0, ()))
+        for node in self.nodes[1:]:
+            nodes.append(node)
+            nodes.extend(self.empty.get(node.index, ()))
+        return EnhancedGraph(
+            ("%d.%d" % (x.index, x.empty) if x.empty else str(x.index),
+             x.deps) for x in nodes)
+
+def parse_deps(value):
+    """ Parse a DEPS value into a list of (head ID, relation) pairs, e.g.
+        '2:nsubj|4.1:nsubj:xsubj' -> [('2', 'nsubj'), ('4.1', 'nsubj:xsubj')].
+        Head IDs are kept as strings, as they may refer to empty nodes.
+    """
+    if not value or value == '_':
+        return []
+    return [tuple(x.split(':', 1)) for x in value.split('|')]
+
+class EnhancedGraph(object):
+    """ An enhanced dependency graph in compact adjacency form.
+
+        Nodes are numbered by their position in the sentence: 0 is the
+        root, followed by the words and empty nodes in file order (an
+        empty node i.k comes after word i). The arcs are kept in three
+        parallel lists, ordered by dependent:
+            ids     - the CoNLL-U ID of every position ('0' for the root)
+            head    - head position of every arc
+            dep     - dependent position of every arc
+            label   - relation of every arc
+            offsets - the arcs of the dependent at position p are
+                      offsets[p - 1]:offsets[p]
+    """
+
+    __slots__ = ('ids', 'head', 'dep', 'label', 'offsets')
+
+    def __init__(self, nodes):
+        """ 'nodes' is a sequence of (ID, DEPS value) pairs, in order. """
+        nodes = list(nodes)
+        self.ids = ['0'] + [x[0] for x in nodes]
+        position = {x: i for i, x in enumerate(self.ids)}
+        self.head, self.dep, self.label = [], [], []
+        self.offsets = [0]
+        for pos, (_, deps) in enumerate(nodes, 1):
+            for head, label in parse_deps(deps):
+                try:
+                    self.head.append(position[head])
+                except KeyError:
+                    raise ValueError("Unknown head in DEPS: " + head) from None
+                self.dep.append(pos)
+                self.label.append(label)
+            self.offsets.append(len(self.dep))
+
+    def __len__(self):
+        return len(self.ids) - 1
+
+    def heads(self, pos):
+        """ Return the (head position, relation) pairs of position 'pos'. """
+        start, end = self.offsets[pos - 1], self.offsets[pos]
+        return list(zip(self.head[start:end], self.label[start:end]))
+
+    def arcs(self):
+        """ Iterate over the arcs as (head, dependent, relation) triples. """
+        return zip(self.head, self.dep, self.label)
+
+    def is_empty(self, pos):
+        """ True if position 'pos' is an empty node. """
+        return '.' in self.ids[pos]
+
+def children_index(heads):
+    """ Return the dependents of every word (in increasing order) as a
+        list of lists indexed by word index; index 0 holds the root(s).
+    """
+    children = [[] for _ in range(len(heads) + 1)]
+    dep = 0
+    for head in heads:
+        dep += 1
+        children[head].append(dep)
+    return children
+
+class TreeIndex(object):
+    """ Depths and ancestors of the words of a dependency tree, computed
+        once from the HEAD column (a list as returned by Sentence.head()).
+        Word indices start from 1, 0 is the artificial root.
+            heads   - the HEAD column, heads[i - 1] is the head of word i
+            order   - word indices, every head before its dependents
+            depth   - depth[i] is 1 for the root word, 2 for its
+                      dependents etc.; depth[0] is 0
+            pre     - pre-order number of every word
+            size    - number of words in the subtree of every word
+        A HEAD column that does not form a tree (a cycle, or a head out
+        of range) raises ValueError.
+    """
+
+    __slots__ = ('heads', 'order', 'depth', 'pre', 'size', '_table')
+
+    def __init__(self, heads):
+        n = len(heads)
+        for dep_idx, head in enumerate(heads):
+            if head is None or not 0 <= head <= n:
+                raise ValueError("Head {} of word {} is out of range"
+                                 .format(head, dep_idx + 1))
+        children = children_index(heads)
+        order = []
+        todo = [0]
+        while todo:
+            node = todo.pop()
+            order.append(node)
+            todo.extend(reversed(children[node]))
+        if len(order) != n + 1:
+            raise ValueError("Cycle in the HEAD column")
+        self.heads = heads
+        self.order = order[1:]
+        depth = [0] * (n + 1)
+        for node in self.order:
+            depth[node] = depth[heads[node - 1]] + 1
+        self.depth = depth
+        # 'order' is a depth-first pre-order traversal
+        pre = [0] * (n + 1)
+        for i, node in enumerate(order):
+            pre[node] = i
+        size = [1] * (n + 1)
+        for node in reversed(self.order):
+            size[heads[node - 1]] += size[node]
+        self.pre = pre
+        self.size = size
+        self._table = None
+
+    def __len__(self):
+        return len(self.heads)
+
+    def head(self, index):
+        return self.heads[index - 1] if index else None
+
+    def ancestors(self, index):
+        """ Iterate over the ancestors of word 'index', nearest first,
+            ending with the root word (the artificial root is excluded).
+        """
+        heads = self.heads
+        index = heads[index - 1]
+        while index != 0:
+            yield index
+            index = heads[index - 1]
+
+    def dominates(self, a, b):
+        """ Return True if 'a' is 'b' or one of its ancestors. """
+        return self.pre[a] <= self.pre[b] < self.pre[a] + self.size[a]
+
+    def lca(self, a, b):
+        """ Return the lowest common ancestor of words 'a' and 'b'
+            (0 if there is none below the artificial root).
+
+            With pre[a] < pre[b], the shallowest word among the pre-order
+            positions pre[a] + 1 .. pre[b] is a child of the LCA. These
+            range minima are answered in O(1) from a sparse table, built
+            in O(n log n) on the first call.
+        """
+        if a == b:
+            return a
+        lo, hi = self.pre[a], self.pre[b]
+        if lo > hi:
+            lo, hi = hi, lo
+        table = self._table
+        if table is None:
+            table = self._table = self._depth_table()
+        level = (hi - lo).bit_length() - 1
+        row = table[level]
+        key = min(row[lo + 1], row[hi + 1 - (1 << level)])
+        return self.heads[key % (len(self.heads) + 1) - 1]
+
+    def _depth_table(self):
+        """ Sparse table of range minima over the words in pre-order,
+            keyed by depth (encoded as depth * (n + 1) + word).
+        """
+        n = len(self.heads)
+        depth = self.depth
+        row = [0] + [depth[x] * (n + 1) + x for x in self.order]
+        table = [row]
+        width = 1
+        while 2 * width <= n + 1:
+            row = table[-1]
+            table.append([min(row[i], row[i + width])
+                          for i in range(len(row) - width)])
+            width *= 2
+        return table
+
+def conllu_sentences(f, lazy=False):
+    """ Iterate over the sentences of a CoNLL-U file. 'f' is a path (see
+        streams.open_input() for standard input and compressed files) or
+        a file-like object. With 'lazy', the columns of the words are only
+        parsed when they are used (see LazyNode).
+    """
     if isinstance(f, str):
-        fp = open(f, 'r')
+        fp = open_input(f)
     else: # assume it is a file-like object
         fp = f
-    sent = Sentence(stream=fp)
+    sent = Sentence(stream=fp, lazy=lazy)
     while sent:
         yield sent
-        sent = Sentence(stream=fp)
+        sent = Sentence(stream=fp, lazy=lazy)
+    if isinstance(f, str): # close only if we opened it
+        fp.close()
+
+FIELDS = ("form", "lemma", "upos", "xpos", "feats",
+          "head", "deprel", "deps", "misc")
+
+_BLANK_LINES = re.compile(r"\n\s*\n")
+
+def write_conllu(sentences, f, bufsize=1 << 20):
+    """ Write sentences to a CoNLL-U file, each followed by an empty line.
+        'f' is a path or a file-like object. The text is collected and
+        written in blocks of about 'bufsize' characters.
+    """
+    if isinstance(f, str):
+        fp = open(f, 'w')
+    else: # assume it is a file-like object
+        fp = f
+    buf = []
+    size = 0
+    for sent in sentences:
+        lines = sent.lines()
+        lines.append("\n")
+        text = "\n".join(lines)
+        buf.append(text)
+        size += len(text)
+        if size >= bufsize:
+            fp.write("".join(buf))
+            buf = []
+            size = 0
+    if buf:
+        fp.write("".join(buf))
     if isinstance(f, str): # close only if we opened it
         fp.close()
+    else:
+        fp.flush()
+
+def conllu_blocks(f, bufsize=1 << 20):
+    """ Iterate over the sentences of a CoNLL-U file as strings, without
+        the separating empty line(s). The input is read in blocks of
+        'bufsize' characters and split on empty lines, instead of line
+        by line. 'f' is a path or a file-like object; a file opened here
+        is closed also if the iteration stops early (when the generator
+        is closed), which stops the reading thread of streams.ReadAhead.
+    """
+    if isinstance(f, str):
+        fp = open_input(f)
+    else: # assume it is a file-like object
+        fp = f
+    try:
+        rest = ""
+        while True:
+            data = fp.read(bufsize)
+            if not data:
+                break
+            blocks = _BLANK_LINES.split(rest + data)
+            rest = blocks.pop()
+            for block in blocks:
+                if block:
+                    yield block
+        if rest and not rest.isspace():
+            yield rest.rstrip("\n")
+    finally:
+        if isinstance(f, str): # close only if we opened it
+            fp.close()
+
+class SentenceColumns(object):
+    """ A sentence restricted to some of the CoNLL-U columns.
+
+        Only the words of the primary tree are kept (no multi-word tokens
+        or empty nodes). The accessors mirror those of Sentence, e.g.
+        head() returns the list of all heads and head(i) the head of the
+        word with index i; the lists are shared, not copied.
+            columns - dictionary of column name to list of values
+            comment - the pre-sentence comments
+    """
+
+    __slots__ = ('columns', 'comment')
+
+    def __init__(self, columns, comment=None):
+        self.columns = columns
+        self.comment = comment or []
+
+    def __len__(self):
+        for column in self.columns.values():
+            return len(column)
+        return 0
+
+    def pos(self, index=None):
+        """Alternative spelling"""
+        return self.upos(index)
+
+def _column_accessor(name):
+    def accessor(self, index=None):
+        column = self.columns[name]
+        if index:
+            return column[index - 1]
+        else:
+            return column
+    accessor.__name__ = name
+    return accessor
+
+for _name in FIELDS:
+    setattr(SentenceColumns, _name, _column_accessor(_name))
+
+_column_patterns = {}
+
+def _column_pattern(fields):
+    """ Regular expression matching the ID column and capturing the
+        given columns of a (regular) word line.
+    """
+    pattern = _column_patterns.get(fields)
+    if pattern is None:
+        last = max(FIELDS.index(x) for x in fields)
+        parts = [r"^\d+"]
+        for name in FIELDS[:last]:
+            parts.append(r"([^\t]*)" if name in fields else r"[^\t]*")
+        parts.append(r"([^\t\n]*)")
+        pattern = re.compile("\t".join(parts), re.M)
+        _column_patterns[fields] = pattern
+    return pattern
+
+def columns_from_str(block, fields=("head", "deprel", "upos")):
+    """ Parse a sentence, as returned by conllu_blocks(), into a
+        SentenceColumns with only the given columns. The other columns
+        are skipped by the regular expression and never become strings.
+        Values are normalized as in Node: HEAD is an integer and an
+        underscore in the optional columns is None.
+    """
+    wanted = set(fields)
+    if "lemma" in wanted:
+        wanted.add("upos")
+    wanted = tuple(x for x in FIELDS if x in wanted)
+    rows = _column_pattern(wanted).findall(block)
+    if len(wanted) == 1:
+        rows = [(x,) for x in rows]
+    values = list(zip(*rows)) if rows else [()] * len(wanted)
+    columns = {}
+    for name, column in zip(wanted, values):
+        if name == "head":
+            try:
+                column = list(map(int, column))
+            except ValueError:
+                column = [None if x == '_' else int(x) for x in column]
+        elif name in ("xpos", "feats", "deps", "misc"):
+            column = [_optional(x) for x in column]
+        else:
+            column = list(column)
+        columns[name] = column
+    if "lemma" in columns:
+        columns["lemma"] = [None if not lemma or
+                                (lemma == '_' and upos != 'PUNCT')
+                            else lemma
+                            for lemma, upos in zip(columns["lemma"],
+                                                   columns["upos"])]
+        if "upos" not in fields:
+            del columns["upos"]
+    comment = []
+    pos = 0
+    while block.startswith('#', pos):
+        end = block.find('\n', pos)
+        if end < 0:
+            end = len(block)
+        comment.append(block[pos:end])
+        pos = end + 1
+    return SentenceColumns(columns, comment)
+
+def conllu_columns(f, fields=("head", "deprel", "upos")):
+    """ Iterate over the sentences of a CoNLL-U file, parsing only the
+        requested columns (a subset of FIELDS). This is considerably
+        faster than conllu_sentences() when only a few columns are used.
+    """
+    fields = tuple(fields)
+    for block in conllu_blocks(f):
+        yield columns_from_str(block, fields)
+
+async def _async_blocks(chunks):
+    """ Split an async iterable of str or bytes (UTF-8) chunks, e.g. an
+        asyncio.StreamReader, into sentence blocks as conllu_blocks().
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    rest = ""
+    async for data in chunks:
+        if isinstance(data, bytes):
+            data = decoder.decode(data)
+        blocks = _BLANK_LINES.split(rest + data)
+        rest = blocks.pop()
+        for block in blocks:
+            if block:
+                yield block
+    rest += decoder.decode(b"", True)
+    if rest and not rest.isspace():
+        yield rest.rstrip("\n")
+
+async def _threaded_blocks(f, batch=256):
+    """ conllu_blocks(f) read in a worker thread, 'batch' blocks at a time.
+        The input is closed when the iteration ends, also if it is
+        stopped early (by aclose() or cancellation); if the thread is
+        still reading then, it closes the input when it is done.
+    """
+    loop = asyncio.get_running_loop()
+    blocks = conllu_blocks(f)
+    reading = threading.Lock()
+
+    def read():
+        with reading:
+            return list(islice(blocks, batch))
+
+    def close():
+        with reading:
+            blocks.close()
+
+    try:
+        while True:
+            chunk = await loop.run_in_executor(None, read)
+            if not chunk:
+                break
+            for block in chunk:
+                yield block
+    finally:
+        if reading.acquire(blocking=False):
+            try:
+                blocks.close()
+            finally:
+                reading.release()
+        else:
+            threading.Thread(target=close, daemon=True).start()
+
+async def aconllu_sentences(source, fields=None):
+    """ Asynchronously iterate over the sentences of 'source', either an
+        async iterable of text or bytes chunks (such as an
+        asyncio.StreamReader), which are parsed as they arrive, or a path
+        or file-like object, which is read in a worker thread. With
+        'fields', yield SentenceColumns as conllu_columns().
+
+            async for sent in aconllu_sentences(reader):
+                ...
+    """
+    if hasattr(source, '__aiter__'):
+        blocks = _async_blocks(source)
+    else:
+        blocks = _threaded_blocks(source)
+    try:
+        async for block in blocks:
+            if fields is None:
+                yield Sentence(instr=block)
+            else:
+                yield columns_from_str(block, fields)
+    finally:
+        # close the input (see _threaded_blocks()) if the caller stops
+        # early, e.g. with aclose()
+        await blocks.aclose()
+
+# the ID and DEPS columns of words and empty nodes (not multi-word tokens)
+_DEPS_LINE = re.compile(r"^([0-9]+(?:\.[0-9]+)?)\t(?:[^\t\n]*\t){7}([^\t\n]*)",
+                        re.M)
+
+def enhanced_from_str(block):
+    """ Return the EnhancedGraph of a sentence block (as returned by
+        conllu_blocks()), reading only the ID and DEPS columns.
+    """
+    return EnhancedGraph(_DEPS_LINE.findall(block))
+
+def conllu_enhanced(f):
+    """ Iterate over the EnhancedGraphs of the sentences of a CoNLL-U file;
+        much faster than Sentence.enhanced() when only DEPS is needed.
+    """
+    for block in conllu_blocks(f):
+        yield enhanced_from_str(block)
 
 def push_test():
     pass
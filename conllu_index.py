@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+
+""" Random access to the sentences of a CoNLL-U file.
+
+    build_index() records the byte range and the sent_id (from the
+    '# sent_id = ...' comment) of every sentence, and saves them in a
+    sidecar file next to the treebank (FILE.conllu.idx). The sidecar
+    stores the size and modification time of the treebank, and is
+    rebuilt when they no longer match.
+
+    IndexedCorpus memory-maps the treebank and parses only the sentences
+    that are requested, by number or by sent_id:
+
+        with IndexedCorpus("en_pud-ud-test.conllu") as corpus:
+            sent = corpus.get("n01001011")
+            last = corpus[-1]
+"""
+
+import mmap
+import os
+import re
+import sys
+from array import array
+from bisect import bisect_right
+
+from conllu import Sentence
+
+SUFFIX = ".idx"
+_HEADER = "# conllu-index"
+
+_SEPARATOR = re.compile(rb"\n(?:[ \t\r]*\n)+")
+_SENT_ID = re.compile(rb"^# sent_id\s*=\s*(\S+)", re.M)
+
+
+def index_path(path):
+    return path + SUFFIX
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def scan(data):
+    """ Return the start and end offsets and the sent_ids of the
+        sentences in 'data' (bytes or an mmap).
+    """
+    starts = array('q')
+    ends = array('q')
+    pos = 0
+    size = len(data)
+    # skip leading empty lines
+    while pos < size and data[pos:pos + 1].isspace():
+        pos += 1
+    for m in _SEPARATOR.finditer(data):
+        if m.start() + 1 > pos:
+            starts.append(pos)
+            ends.append(m.start() + 1)
+        pos = m.end()
+    rest = data[pos:]
+    if rest.strip():
+        starts.append(pos)
+        ends.append(pos + len(rest.rstrip(b" \t\r\n")) + 1)
+    sent_ids = [None] * len(starts)
+    for m in _SENT_ID.finditer(data):
+        number = bisect_right(starts, m.start()) - 1
+        if number >= 0 and sent_ids[number] is None:
+            sent_ids[number] = m.group(1).decode('utf-8')
+    return starts, ends, sent_ids
+
+
+def build_index(path):
+    """ Scan 'path', write its sidecar index and return the index as
+        (starts, ends, sent_ids).
+    """
+    with open(path, 'rb') as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            starts, ends, sent_ids = array('q'), array('q'), []
+        else:
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                starts, ends, sent_ids = scan(data)
+    size, mtime = _stamp(path)
+    with open(index_path(path), 'w', encoding='utf-8') as out:
+        out.write("{} {} {}\n".format(_HEADER, size, mtime))
+        for start, end, sent_id in zip(starts, ends, sent_ids):
+            out.write("{}\t{}\t{}\n".format(start, end,
+                                            '_' if sent_id is None
+                                            else sent_id))
+    return starts, ends, sent_ids
+
+
+def load_index(path):
+    """ Return the sidecar index of 'path' as (starts, ends, sent_ids),
+        or None if there is none or it is out of date.
+    """
+    try:
+        fp = open(index_path(path), 'r', encoding='utf-8')
+    except OSError:
+        return None
+    with fp:
+        header = fp.readline().split()
+        if header[:2] != _HEADER.split() or \
+                tuple(map(int, header[2:4])) != _stamp(path):
+            return None
+        starts = array('q')
+        ends = array('q')
+        sent_ids = []
+        for line in fp:
+            start, end, sent_id = line.rstrip('\n').split('\t')
+            starts.append(int(start))
+            ends.append(int(end))
+            sent_ids.append(None if sent_id == '_' else sent_id)
+    return starts, ends, sent_ids
+
+
+def get_index(path):
+    """ Load the sidecar index of 'path', building it if necessary.
+    """
+    index = load_index(path)
+    if index is None:
+        index = build_index(path)
+    return index
+
+
+class IndexedCorpus(object):
+    """ Memory-mapped CoNLL-U file with access to sentences by number
+        (starting from 0) or by sent_id.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.starts, self.ends, self.sent_ids = get_index(path)
+        self.numbers = {x: i for i, x in enumerate(self.sent_ids)
+                        if x is not None}
+        self._fp = open(path, 'rb')
+        if self.starts:
+            self._data = mmap.mmap(self._fp.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+        else:
+            self._data = b""
+
+    def __len__(self):
+        return len(self.starts)
+
+    def block(self, number):
+        """ Return the text of sentence 'number'. """
+        return self._data[self.starts[number]:self.ends[number]].decode('utf-8')
+
+    def __getitem__(self, number):
+        if number < 0:
+            number += len(self)
+        if not 0 <= number < len(self):
+            raise IndexError("sentence index out of range")
+        return Sentence(instr=self.block(number))
+
+    def __contains__(self, sent_id):
+        return sent_id in self.numbers
+
+    def get(self, sent_id):
+        """ Return the sentence with the given sent_id (KeyError if
+            there is none).
+        """
+        return self[self.numbers[sent_id]]
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    # Build (or refresh) the indexes of the files given as arguments.
+    for path in sys.argv[1:]:
+        starts, _, _ = build_index(path)
+        print(index_path(path), "\t", len(starts))
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+
+""" Incremental analysis of treebanks that are edited a few sentences at
+    a time.
+
+    The result of every analyzer (see analyzers.py) is stored for each
+    sentence, keyed by a hash of the text of the sentence block (the
+    text returned by Sentence.read_sentence()). On the next run only
+    the sentences whose text is not in the store are parsed and
+    analyzed, and the stored totals are updated by subtracting the rows
+    of the removed sentences and adding those of the new ones, so they
+    are the same as those of a full run (with the keys of the Counters
+    in the same order).
+
+    This works for analyzers whose accumulators are Counters (or tuples
+    of Counters) merged by adding them, i.e. all built-in analyzers but
+    'projectivize'; the others are run over the whole file every time.
+
+    The store of a treebank is kept in the cache directory (see
+    cache.py), per treebank path and analyzer configuration, in two
+    files:
+
+        NAME.N.rows the per-sentence results, appended to on every run:
+                    (column, count) pairs as native 64-bit integers,
+                    without the zero counts of the keys of Analyzer.new()
+        NAME.inc    a header line with the size and modification time
+                    of the treebank, the columns (analyzer number, part
+                    of the accumulator and key, one repr() per line),
+                    followed by the raw arrays of the totals of the
+                    columns, the first sentence (and the position in
+                    its row) of every column, the sentence hashes of
+                    the last version of the file and the ranges of
+                    their rows in NAME.N.rows
+
+    The .inc file is small (36 bytes per sentence and a few per column)
+    and rewritten on every run; the rows of unchanged sentences are not
+    read or written again. The rows file is compacted when less than
+    half of it is in use.
+"""
+
+import ast
+import hashlib
+import mmap
+import os
+import sys
+from array import array
+from collections import Counter
+
+from analyzers import Analyzer, needed_fields
+from cache import cache_dir
+from conllu import Sentence, conllu_blocks, columns_from_str
+from parallel import read_sentences
+from pipeline import batched
+from streams import is_stream
+
+MAGIC = "ud-projectivity-incremental"
+VERSION = 2
+KEY_SIZE = hashlib.sha1().digest_size
+
+
+def sentence_key(block):
+    """ Content hash of a sentence block. """
+    return hashlib.sha1(block.encode('utf-8')).digest()
+
+
+def store_file(path, analyzers):
+    """ Return the name of the store of treebank 'path' for 'analyzers';
+        analyzers with different names or options get separate stores.
+    """
+    config = repr([(a.name, sorted(vars(a).items())) for a in analyzers])
+    key = hashlib.sha1("{}\0{}".format(os.path.abspath(path), config)
+                       .encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir(), key + ".inc")
+
+
+def rows_file(filename, generation):
+    """ Return the name of the rows file of store 'filename'; compacting
+        the rows starts a new generation, so that the old index never
+        refers to the new rows.
+    """
+    return "{}.{}.rows".format(os.path.splitext(filename)[0], generation)
+
+
+def countable(analyzer):
+    """ Whether the accumulators of 'analyzer' can be stored as counts:
+        Counters (or tuples of Counters) merged by adding them.
+    """
+    acc = analyzer.new()
+    parts = acc if isinstance(acc, tuple) else (acc,)
+    return (all(isinstance(x, Counter) for x in parts) and
+            type(analyzer).merge is Analyzer.merge)
+
+
+def _stamp(path):
+    if is_stream(path) and not os.path.isfile(path):
+        return None
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _common_prefix(a, b):
+    """ Return the length of the longest common prefix of bytes 'a' and
+        'b', in multiples of KEY_SIZE.
+    """
+    lo, hi = 0, min(len(a), len(b)) // KEY_SIZE
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid * KEY_SIZE] == b[:mid * KEY_SIZE]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a, b, limit):
+    """ As _common_prefix(), for the suffixes (at most 'limit' keys). """
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid * KEY_SIZE:] == b[len(b) - mid * KEY_SIZE:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class Store(object):
+    """ The stored results of a treebank (see the module docstring).
+            columns  - (analyzer, part, key) of every column
+            totals   - array('q'), the total count of every column
+            first    - array('q'), the first sentence in which every
+                       column occurs (-1 if none)
+            offset   - array('q'), the position of the column in the row
+                       of that sentence
+            keys     - the sentence hashes, in the order of the file
+            starts   - array('q'), start of the row of every sentence in
+                       the rows file (in integers)
+            ends     - array('q'), end of the row of every sentence
+            stamp    - (size, mtime) of the treebank, or None
+            size     - number of integers in use in the rows file
+            generation - number of the rows file (see rows_file())
+    """
+
+    def __init__(self):
+        self.columns = []
+        self.numbers = dict()
+        self.totals = array('q')
+        self.first = array('q')
+        self.offset = array('q')
+        self.keys = b""
+        self.starts = array('q')
+        self.ends = array('q')
+        self.stamp = None
+        self.size = 0
+        self.generation = 0
+
+    def column(self, name):
+        """ Return the number of column 'name', adding it if it is new. """
+        number = self.numbers.get(name)
+        if number is None:
+            number = self.numbers[name] = len(self.columns)
+            self.columns.append(name)
+            self.totals.append(0)
+            self.first.append(-1)
+            self.offset.append(0)
+        return number
+
+    def row(self, accs, initial):
+        """ Return the (column, count) pairs of the per-sentence
+            accumulators 'accs', without the zero counts of the keys of
+            the 'initial' accumulators (these are always reported).
+        """
+        row = array('q')
+        for i, (acc, new) in enumerate(zip(accs, initial)):
+            if not isinstance(acc, tuple):
+                acc, new = (acc,), (new,)
+            for j, part in enumerate(acc):
+                for key, value in part.items():
+                    if value or key not in new[j]:
+                        row.append(self.column((i, j, key)))
+                        row.append(value)
+        return row
+
+    def accumulators(self, analyzers):
+        """ Return the totals as accumulators of 'analyzers', with the
+            keys in the order of a full run (see parallel.add_counters()).
+        """
+        accs = [a.new() for a in analyzers]
+        used = sorted((self.first[c], self.offset[c], c)
+                      for c in range(len(self.columns)) if self.first[c] >= 0)
+        for _, _, c in used:
+            i, j, key = self.columns[c]
+            part = accs[i][j] if isinstance(accs[i], tuple) else accs[i]
+            part[key] += self.totals[c]
+        return accs
+
+
+def load_store(filename):
+    """ Return the Store saved in 'filename', or an empty one. """
+    store = Store()
+    try:
+        fp = open(filename, 'rb')
+    except OSError:
+        return store
+    with fp:
+        header = fp.readline().decode('utf-8', 'replace').split()
+        if header[:3] != [MAGIC, str(VERSION), sys.byteorder] or \
+                len(header) != 9:
+            return store
+        ncolumns, nsent = int(header[5]), int(header[6])
+        size, generation = int(header[7]), int(header[8])
+        try:
+            if os.path.getsize(rows_file(filename, generation)) < size * 8:
+                return store
+        except OSError:
+            return store
+        store.columns = [ast.literal_eval(fp.readline().decode('utf-8'))
+                         for _ in range(ncolumns)]
+        store.numbers = {name: c for c, name in enumerate(store.columns)}
+        try:
+            for name in ("totals", "first", "offset"):
+                getattr(store, name).fromfile(fp, ncolumns)
+            keys = fp.read(nsent * KEY_SIZE)
+            store.starts.fromfile(fp, nsent)
+            store.ends.fromfile(fp, nsent)
+        except EOFError:
+            return Store()
+        store.keys = keys
+        store.stamp = None if header[3] == '_' else (int(header[3]),
+                                                     int(header[4]))
+        store.size, store.generation = size, generation
+    return store
+
+
+def save_store(filename, store):
+    """ Save the index of 'store' (the rows are written by the caller). """
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    size, mtime = store.stamp or ('_', '_')
+    header = [MAGIC, VERSION, sys.byteorder, size, mtime, len(store.columns),
+              len(store.starts), store.size, store.generation]
+    tmp = "{}.{}.tmp".format(filename, os.getpid())
+    with open(tmp, 'wb') as fp:
+        lines = [" ".join(str(x) for x in header)]
+        lines.extend(repr(x) for x in store.columns)
+        lines.append("")
+        fp.write("\n".join(lines).encode('utf-8'))
+        store.totals.tofile(fp)
+        store.first.tofile(fp)
+        store.offset.tofile(fp)
+        fp.write(store.keys)
+        store.starts.tofile(fp)
+        store.ends.tofile(fp)
+    os.replace(tmp, filename)
+
+
+def _compact(filename, store, rows):
+    """ Write the rows of 'store' that are in use to a new rows file;
+        'rows' is the (memory-mapped) old rows file.
+    """
+    new_rows = array('q')
+    moved = dict()
+    for n, (start, end) in enumerate(zip(store.starts, store.ends)):
+        span = moved.get(start)
+        if span is None:
+            span = moved[start] = (len(new_rows), len(new_rows) + end - start)
+            new_rows.extend(rows[start:end].tolist())
+        store.starts[n], store.ends[n] = span
+    store.generation += 1
+    with open(rows_file(filename, store.generation), 'wb') as fp:
+        new_rows.tofile(fp)
+    store.size = len(new_rows)
+
+
+def _update(store, keys, starts, ends, rows):
+    """ Replace the sentences of 'store' with 'keys' (rows in 'starts' and
+        'ends'), updating the totals and first occurrences of the columns
+        from the rows of the changed sentences only. 'rows' gives the row
+        between two positions of the rows file.
+    """
+    old, old_starts, old_ends = store.keys, store.starts, store.ends
+    n_old, n_new = len(old_starts), len(starts)
+    p = _common_prefix(old, keys)
+    s = _common_suffix(old, keys, min(n_old, n_new) - p)
+    totals, first, offset = store.totals, store.first, store.offset
+    for n in range(p, n_old - s):
+        row = rows(old_starts[n], old_ends[n])
+        for k in range(0, len(row), 2):
+            totals[row[k]] -= row[k + 1]
+    # Columns first seen before the change keep their first sentence,
+    # those first seen after it move with it, and those first seen in
+    # the removed sentences are searched for again.
+    delta = n_new - n_old
+    lost = set()
+    for c in range(len(first)):
+        if first[c] >= n_old - s:
+            first[c] += delta
+        elif first[c] >= p:
+            first[c] = -1
+            lost.add(c)
+    for n in range(p, n_new - s):
+        row = rows(starts[n], ends[n])
+        for k in range(0, len(row), 2):
+            c = row[k]
+            totals[c] += row[k + 1]
+            if first[c] < 0 or first[c] > n:
+                first[c], offset[c] = n, k // 2
+                lost.discard(c)
+    for n in range(n_new - s, n_new):
+        if not lost:
+            break
+        row = rows(starts[n], ends[n])
+        for k in range(0, len(row), 2):
+            if row[k] in lost:
+                first[row[k]], offset[row[k]] = n, k // 2
+                lost.discard(row[k])
+    store.keys, store.starts, store.ends = keys, starts, ends
+
+
+def _analyze_counts(path, analyzers):
+    """ analyze_file() for analyzers whose accumulators are stored as
+        counts (see countable()).
+    """
+    filename = store_file(path, analyzers)
+    store = load_store(filename)
+    stamp = _stamp(path)
+    if stamp is not None and stamp == store.stamp:
+        return store.accumulators(analyzers), 0
+    fields = needed_fields(analyzers)
+    initial = [a.new() for a in analyzers]
+    known = dict()
+    old = store.keys
+    for n in range(len(store.starts)):
+        known[old[n * KEY_SIZE:(n + 1) * KEY_SIZE]] = (store.starts[n],
+                                                       store.ends[n])
+    base = store.size
+    new_rows = array('q')
+    keys, starts, ends = [], array('q'), array('q')
+    analyzed = 0
+    for block in conllu_blocks(path):
+        key = sentence_key(block)
+        span = known.get(key)
+        if span is None:
+            if fields is None:
+                sent = Sentence(instr=block)
+            else:
+                sent = columns_from_str(block, fields)
+            accs = [a.update(a.new(), sent) for a in analyzers]
+            start = base + len(new_rows)
+            new_rows.extend(store.row(accs, initial))
+            span = known[key] = (start, base + len(new_rows))
+            analyzed += 1
+        keys.append(key)
+        starts.append(span[0])
+        ends.append(span[1])
+    keys = b"".join(keys)
+
+    rows_name = rows_file(filename, store.generation)
+    os.makedirs(os.path.dirname(rows_name), exist_ok=True)
+    with open(rows_name, 'a+b') as fp:
+        fp.truncate(base * 8)
+        new_rows.tofile(fp)
+        fp.flush()
+        mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) \
+            if base + len(new_rows) else None
+    try:
+        # the rows are copied out of the map, so that no view of it is
+        # left when it is closed
+        with memoryview(b"" if mapped is None else mapped).cast('q') as data:
+            _update(store, keys, starts, ends,
+                    lambda a, b: data[a:b].tolist())
+            store.size = base + len(new_rows)
+            store.stamp = stamp
+            if store.size > 2 * (sum(store.ends) - sum(store.starts)) + 1024:
+                _compact(filename, store, data)
+    finally:
+        if mapped is not None:
+            try:
+                mapped.close()
+            except BufferError:
+                # still exported (by a traceback being raised); it is
+                # closed when it is garbage collected
+                pass
+    save_store(filename, store)
+    if rows_file(filename, store.generation) != rows_name:
+        os.remove(rows_name)
+    return store.accumulators(analyzers), analyzed
+
+
+def _analyze_all(path, analyzers):
+    """ Run 'analyzers' over all sentences of 'path' (for accumulators
+        that are not stored, see countable()).
+    """
+    accs = [a.new() for a in analyzers]
+    for sents in batched(read_sentences(path, needed_fields(analyzers))):
+        for sent in sents:
+            accs = [a.update(acc, sent) for a, acc in zip(analyzers, accs)]
+        accs = [a.emit(acc) for a, acc in zip(analyzers, accs)]
+    return accs
+
+
+def analyze_file(path, analyzers):
+    """ Run 'analyzers' over treebank 'path', reusing the stored results
+        of unchanged sentences. Return the merged accumulators (in the
+        order of 'analyzers') and the number of sentences analyzed.
+    """
+    counted = [a for a in analyzers if countable(a)]
+    others = sorted((a for a in analyzers if not countable(a)),
+                    key=lambda a: a.modifies)
+    merged = dict()
+    analyzed = 0
+    if counted:
+        accs, analyzed = _analyze_counts(path, counted)
+        merged.update(zip(map(id, counted), accs))
+    if others:
+        merged.update(zip(map(id, others), _analyze_all(path, others)))
+    return [merged[id(a)] for a in analyzers], analyzed
+
+
+def run(paths, analyzers, log=None):
+    """ As analyze.run(), incrementally. If 'log' is a file, the number
+        of re-analyzed sentences of each treebank is written to it.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    total = None
+    for path in paths:
+        accs, analyzed = analyze_file(path, analyzers)
+        if log is not None:
+            print("{}: {} sentence(s) analyzed".format(path, analyzed),
+                  file=log)
+        if total is None:
+            total = accs
+        else:
+            total = [a.merge(x, y) for a, x, y in zip(analyzers, total, accs)]
+    return total
+
+
+if __name__ == '__main__':
+    # Non-projectivity and word order statistics of the files given as
+    # arguments, as 'analyze.py --incremental FILE...'.
+    from analyzers import NonProjectivity, WordOrder
+    analyzers = [NonProjectivity(), WordOrder()]
+    accs = run(sys.argv[1:], analyzers, log=sys.stderr)
+    for analyzer, acc in zip(analyzers, accs):
+        print("#", analyzer.name)
+        analyzer.report(acc)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+
+""" Timers and counters for finding out where the time of a run goes.
+
+    Profiling is enabled with the --profile option of the programs, or
+    by setting the environment variable UD_PROFILE (to any non-empty
+    value). At exit, a report is written to standard error with the
+    wall time of each stage (reading, parsing, processing the sentences,
+    writing), the number of sentences per second, the slowest sentences
+    and a histogram of the sentence lengths. '--pstats FILE' (or
+    UD_PSTATS=FILE) also runs the whole program under cProfile and
+    saves the statistics for pstats or snakeviz.
+
+    When profiling is off, nothing is timed: the programs only check
+    enabled() when they set up their input and output. Profiling runs in
+    a single process, so --jobs is ignored.
+"""
+
+import atexit
+import cProfile
+import heapq
+import os
+import sys
+import time
+from collections import Counter
+
+import cache
+from conllu import Sentence, conllu_blocks, columns_from_str
+
+SLOWEST = 10
+BIN = 10  # width of the sentence length histogram bins
+
+_profile = None
+
+
+class Profile(object):
+    """ Accumulated timings of a run.
+            seconds  - stage name to seconds
+            lengths  - histogram of sentence lengths (bin to count)
+            slowest  - heap of (seconds, number, sent_id, length) of the
+                       sentences that took longest to process
+    """
+
+    def __init__(self, slowest=SLOWEST):
+        self.start = time.perf_counter()
+        self.seconds = Counter()
+        self.sentences = 0
+        self.tokens = 0
+        self.lengths = Counter()
+        self.slowest = []
+        self.keep = slowest
+        self.profiler = None
+        self.pstats = None
+
+    def add(self, stage, seconds):
+        self.seconds[stage] += seconds
+
+    def sentence(self, sent, seconds):
+        """ Record a sentence that took 'seconds' to process. """
+        self.sentences += 1
+        n = len(sent)
+        self.tokens += n
+        self.lengths[n // BIN] += 1
+        self.seconds["process"] += seconds
+        if len(self.slowest) < self.keep:
+            heapq.heappush(self.slowest,
+                           (seconds, self.sentences, sent_id(sent), n))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest,
+                              (seconds, self.sentences, sent_id(sent), n))
+
+    def report(self, out=sys.stderr):
+        total = time.perf_counter() - self.start
+        seconds = Counter(self.seconds)
+        # writing happens while the sentences are processed
+        seconds["process"] -= seconds["write"]
+        seconds["other"] = total - sum(seconds.values())
+        print("# profile", file=out)
+        for stage in ("read", "parse", "process", "write", "other"):
+            if stage in seconds:
+                print(stage, "\t", round(seconds[stage], 3), "s", "\t",
+                      round(seconds[stage] / total * 100, 1), "%", file=out)
+        print("total", "\t", round(total, 3), "s", "\t",
+              self.sentences, "sentences", "\t",
+              round(self.sentences / total, 1), "sentences/s", "\t",
+              round(self.tokens / total, 1), "tokens/s", file=out)
+        print("# slowest sentences", file=out)
+        for secs, number, sid, n in sorted(self.slowest, reverse=True):
+            print(sid or "#{}".format(number), "\t", n, "words", "\t",
+                  round(secs * 1000, 3), "ms", file=out)
+        print("# sentence lengths", file=out)
+        for b in sorted(self.lengths):
+            print("{}-{}".format(b * BIN, b * BIN + BIN - 1), "\t",
+                  self.lengths[b], file=out)
+
+
+def sent_id(sent):
+    """ Return the sent_id of a sentence of any of the sentence types,
+        or None.
+    """
+    if hasattr(sent, 'sent_id'):  # columnar.CorpusSentence
+        return sent.sent_id
+    for line in getattr(sent, 'comment', ()):
+        if line.startswith('# sent_id'):
+            return line.split('=', 1)[1].strip()
+    return None
+
+
+def enabled():
+    return _profile is not None
+
+
+def profile():
+    """ The current Profile, or None if profiling is off. """
+    return _profile
+
+
+def enable(pstats=None):
+    """ Start profiling; the report is printed at exit. If 'pstats' is
+        a file name, cProfile statistics are saved to it as well.
+    """
+    global _profile
+    if _profile is not None:
+        return _profile
+    _profile = Profile()
+    if pstats:
+        _profile.pstats = pstats
+        _profile.profiler = cProfile.Profile()
+        _profile.profiler.enable()
+    atexit.register(finish)
+    return _profile
+
+
+def finish():
+    """ Stop profiling and print the report. """
+    global _profile
+    p, _profile = _profile, None
+    if p is None:
+        return
+    if p.profiler is not None:
+        p.profiler.disable()
+        p.profiler.dump_stats(p.pstats)
+    p.report()
+
+
+def add_arguments(ap):
+    ap.add_argument('--profile', action='store_true',
+                    help="report where the time goes (also: $UD_PROFILE)")
+    ap.add_argument('--pstats', metavar='FILE',
+                    help="save cProfile statistics of the run to FILE "
+                         "(also: $UD_PSTATS)")
+
+
+def setup(args):
+    """ Enable profiling if requested with the options added by
+        add_arguments() or the environment. Return True if enabled.
+    """
+    pstats = args.pstats or os.environ.get("UD_PSTATS")
+    if args.profile or pstats or os.environ.get("UD_PROFILE"):
+        enable(pstats)
+        if getattr(args, 'jobs', 1) > 1:
+            print("profiling: ignoring --jobs", file=sys.stderr)
+            args.jobs = 1
+    return enabled()
+
+
+def sentences(path, fields=None, cached=False):
+    """ Iterate over the sentences of 'path' as parallel.read_sentences()
+        (or from the binary cache, if 'cached'), timing the reading and
+        parsing of every sentence, and the time the caller spends on it
+        before asking for the next one.
+    """
+    p = _profile
+    clock = time.perf_counter
+    if cached:
+        start = clock()
+        items = iter(cache.load(path))
+        p.add("read", clock() - start)
+        parse = None
+    else:
+        items = conllu_blocks(path)
+        if fields is None:
+            parse = lambda block: Sentence(instr=block, lazy=True)
+        else:
+            parse = lambda block: columns_from_str(block, fields)
+    while True:
+        start = clock()
+        item = next(items, None)
+        read = clock()
+        if item is None:
+            p.add("read", read - start)
+            return
+        sent = parse(item) if parse else item
+        parsed = clock()
+        p.add("read", read - start)
+        p.add("parse", parsed - read)
+        yield sent
+        p.sentence(sent, clock() - parsed)
+
+
+class Writer(object):
+    """ File wrapper adding the time spent in write() to the 'write'
+        stage.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+
+    def write(self, text):
+        start = time.perf_counter()
+        n = self.fp.write(text)
+        _profile.add("write", time.perf_counter() - start)
+        return n
+
+    def flush(self):
+        self.fp.flush()
+
+
+def output(fp=sys.stdout):
+    """ Return 'fp', wrapped in a Writer if profiling is on. """
+    return Writer(fp) if enabled() else fp
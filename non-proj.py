@@ -1,50 +1,58 @@
 #!/usr/bin/python3
 
-import sys
-from conllu import conllu_sentences
+import argparse
+import instrument
+from collections import Counter
+from parallel import map_reduce
+from projectivity import is_projective
 
 def is_non_proj(sent):
-    """ Return True if 'sent' is non-projective.
-    The prior condition is that the current_dep_id is always less than dep_id.
-        Then there is only 4 types of crossing edges.
-        1) current dependency is a right arc, when head_id is
-        inside the range of current_head_id and current_dep_id, there is a crossing edge.
-        2) current dependency is a left arc, and the head of current dependency is between two dependency ids.
-        There is a crossing edge when head id is inside the rage of current_dep_id and current_head_id.
-        3) & 4) current dependency is a left arc, and the current_head_id is bigger than the dep_id.
-        There is a crossing edge when head_id is not inside the range of current_dep_id and current_head_id.
+    """ Return True if 'sent' is non-projective, i.e. if any two arcs
+    (excluding the arcs from the root) cross. The check is a single
+    linear pass over the sentence, see projectivity.is_projective().
     """
-    head_list = s.head()
-    head_dep_list = []
-    for dep_idx, current_head_id in enumerate(head_list):
-        if current_head_id == 0:
-            continue
-        dep_id = dep_idx + 1
-        head_dep_list.append((current_head_id, dep_id))
-    for i, (current_head_id, current_dep_id) in enumerate(head_dep_list):
-        for (head_id, dep_id) in head_dep_list[i:]:  # current_dep_id < dep_id
-            if current_head_id == head_id:#same head, projective
-                continue
-            #  1)
-            elif current_head_id < current_dep_id and current_head_id < head_id < current_dep_id:
-                return True
-            #  2)
-            elif current_dep_id < current_head_id < dep_id and current_dep_id < head_id < current_head_id:
-                return True
-            #  3) & 4)
-            elif current_head_id > dep_id and (head_id < current_dep_id or current_head_id < head_id):
-                return True
-    return False
+    return not is_projective(sent.head())
+
+def count_non_proj(sentences):
+    """ Return a Counter with the number of sentences ('sent') and
+    non-projective sentences ('non_proj') in 'sentences'.
+    """
+    counts = Counter(sent=0, non_proj=0)
+    for s in sentences:
+        counts['sent'] += 1
+        if is_non_proj(s):
+            counts['non_proj'] += 1
+    return counts
 
 if __name__ == '__main__':
-    # initialize variable
-    non_proj = 0
-    sent = 0
+    ap = argparse.ArgumentParser()
+    ap.add_argument('files', nargs='+')
+    ap.add_argument('--jobs', '-j', type=int, default=1,
+                    help="number of worker processes")
+    ap.add_argument('--no-cache', action='store_true',
+                    help="parse the files instead of using the binary cache")
+    ap.add_argument('--vectorized', action='store_true',
+                    help="load the whole treebank and use NumPy")
+    instrument.add_arguments(ap)
+    args = ap.parse_args()
+    instrument.setup(args)
     # check file name
-    assert (".conllu" in sys.argv[1]), "Incorrect file! Please use a .conllu file."
-    for s in conllu_sentences(sys.argv[1]):
-        sent += 1
-        if is_non_proj(s):
-            non_proj += 1
+    for f in args.files:
+        assert (".conllu" in f or f == "-"), "Incorrect file! Please use a .conllu file."
+    if args.vectorized:
+        import columnar
+        import cache
+        import vectorized
+        corpus = columnar.Corpus()
+        for f in args.files:
+            corpus.extend(cache.load(f, not args.no_cache))
+        non_proj = int(vectorized.non_projective(corpus).sum())
+        sent = len(corpus)
+    else:
+        counts = map_reduce(args.files, count_non_proj, jobs=args.jobs,
+                            fields=('head',), use_cache=not args.no_cache)
+        non_proj = counts['non_proj']
+        sent = counts['sent']
     # <Print out the results>
-    print("NON-PROJ", "\t", non_proj, "\t", round(non_proj / sent * 100, 2), "%")
\ No newline at end of file
+    print("NON-PROJ", "\t", non_proj, "\t",
+          round(non_proj / sent * 100, 2) if sent else 0.0, "%")
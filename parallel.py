@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+""" Run per-sentence work over CoNLL-U files on several processes.
+
+    A file is split into byte ranges that start and end at sentence
+    boundaries (blank lines), taken from the sidecar index of the file
+    if there is an up-to-date one (see conllu_index.py). Every chunk is handed to a worker, which
+    applies a function to the sentences of the chunk. The results come
+    back in the order of the input, so that they can be merged (reduced)
+    or written out exactly as a serial run would.
+
+    The function applied to the chunks must be defined at module level
+    (so that it can be pickled), and it receives an iterator over the
+    sentences of one chunk.
+
+    Standard input and compressed files (see streams.py) cannot be split
+    by byte offset; they are read in the main process and sent to the
+    workers in chunks of text.
+"""
+
+import io
+import os
+from bisect import bisect_left
+from collections import Counter
+from functools import reduce
+from multiprocessing import Pool
+
+import cache
+import instrument
+from columnar import COLUMNS
+from conllu import conllu_blocks, conllu_sentences, conllu_columns
+from conllu_index import load_index
+from streams import is_stream
+
+CHUNKS_PER_JOB = 4
+MIN_CHUNK = 2000  # sentences per chunk of a cached file, at least
+STREAM_CHUNK_SIZE = 1 << 22
+
+
+def chunk_boundaries(path, chunks):
+    """ Return a list of byte offsets splitting 'path' into at most
+        'chunks' ranges, each of which begins at the start of a sentence.
+        The list starts with 0 and ends with the size of the file.
+    """
+    size = os.path.getsize(path)
+    index = load_index(path)
+    if index is not None:
+        # exact sentence offsets from the sidecar index
+        starts = index[0]
+        bounds = [0]
+        for i in range(1, chunks):
+            number = bisect_left(starts, size * i // chunks)
+            if number < len(starts) and starts[number] > bounds[-1]:
+                bounds.append(starts[number])
+        bounds.append(size)
+        return bounds
+    bounds = [0]
+    with open(path, 'rb') as fp:
+        for i in range(1, chunks):
+            pos = size * i // chunks
+            if pos <= bounds[-1]:
+                continue
+            fp.seek(pos)
+            fp.readline() # skip the (possibly partial) current line
+            line = fp.readline()
+            while line and not line.isspace():
+                line = fp.readline()
+            pos = fp.tell()
+            if pos >= size:
+                break
+            bounds.append(pos)
+    bounds.append(size)
+    return bounds
+
+
+def read_sentences(f, fields=None):
+    """ Iterate over full Sentence objects (with lazily parsed words, see
+        conllu.LazyNode), or over SentenceColumns with only the given
+        columns if 'fields' is set.
+    """
+    if fields is None:
+        return conllu_sentences(f, lazy=True)
+    return conllu_columns(f, fields)
+
+
+def chunk_sentences(path, start, end, fields=None):
+    """ Iterate over the sentences in the byte range [start, end) of 'path'.
+    """
+    with open(path, 'rb') as fp:
+        fp.seek(start)
+        data = fp.read(end - start)
+    return read_sentences(io.StringIO(data.decode('utf-8')), fields)
+
+
+_corpus = None  # (path, Corpus) of the file this process used last
+
+def _cached_corpus(path):
+    """ The cached Corpus of 'path' (see cache.load()). A (worker)
+        process keeps only the corpus of the file it used last, as the
+        chunks of a file are handed out one after the other.
+    """
+    global _corpus
+    if _corpus is None or _corpus[0] != path:
+        _corpus = None  # release the previous corpus before loading
+        _corpus = (path, cache.load(path))
+    return _corpus[1]
+
+
+def stream_chunks(path, size=STREAM_CHUNK_SIZE):
+    """ Yield the text of consecutive runs of sentences of 'path' (see
+        streams.open_input()) of about 'size' characters each; an empty
+        input gives one empty chunk.
+    """
+    blocks = []
+    length = 0
+    empty = True
+    for block in conllu_blocks(path):
+        blocks.append(block)
+        length += len(block)
+        if length >= size:
+            yield "\n\n".join(blocks) + "\n\n"
+            blocks = []
+            length = 0
+            empty = False
+    if blocks or empty:
+        yield "".join(x + "\n\n" for x in blocks)
+
+
+def _run_chunk(task):
+    func, path, start, end, fields, cached = task
+    if cached:
+        corpus = _cached_corpus(path)
+        if end is None:
+            # the whole file, whose cache was (re)built by the worker
+            end = len(corpus)
+        return path, func(corpus[i] for i in range(start, end))
+    if start is None:
+        # 'end' is the text of a chunk of a stream
+        return path, func(read_sentences(io.StringIO(end), fields))
+    return path, func(chunk_sentences(path, start, end, fields))
+
+
+def _tasks(paths, func, jobs, fields, cached):
+    """ Generate the chunks of 'paths' as arguments of _run_chunk(); every
+        file has at least one (possibly empty) chunk, so that there is a
+        result per file.
+    """
+    for path in paths:
+        if is_stream(path):
+            for text in stream_chunks(path):
+                yield func, path, None, text, fields, False
+            continue
+        if cached:
+            n = cache.cached_length(path)
+            if n is None:
+                # not cached (or out of date): a worker parses the file
+                # and saves the cache, instead of the main process
+                yield func, path, 0, None, fields, True
+                continue
+            # a worker loads the whole cache of a file for any chunk of
+            # it, so small files (many of them, in batch.py) are not split
+            chunks = max(1, min(jobs * CHUNKS_PER_JOB, n // MIN_CHUNK))
+            bounds = sorted(set(n * i // chunks for i in range(chunks + 1)))
+            if len(bounds) == 1:
+                bounds.append(n)
+        else:
+            bounds = chunk_boundaries(path, jobs * CHUNKS_PER_JOB)
+        for start, end in zip(bounds, bounds[1:]):
+            yield func, path, start, end, fields, cached
+
+
+def imap_sentences(paths, func, jobs=1, fields=None, use_cache=False):
+    """ Yield func(sentences) for consecutive chunks of the files in
+        'paths'; see imap_files().
+    """
+    for _, result in imap_files(paths, func, jobs, fields, use_cache):
+        yield result
+
+
+def imap_files(paths, func, jobs=1, fields=None, use_cache=False):
+    """ Yield (path, func(sentences)) for consecutive chunks of the files
+        in 'paths' (a single path is also accepted), in input order.
+        With jobs <= 1 every file is a single chunk processed in the
+        current process. If 'fields' is given, only those columns are
+        parsed (see conllu.conllu_columns()).
+
+        With use_cache=True, and if 'fields' are among the columns of
+        a columnar.Corpus, the sentences are read from the binary cache
+        (see cache.py) and the chunks are ranges of sentence numbers. A
+        file that is not cached yet is a single chunk: the worker that
+        gets it parses it and saves its cache, so the main process never
+        parses or loads the files.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    cached = (use_cache and fields is not None and
+              set(fields) <= set(COLUMNS))
+    if jobs <= 1:
+        for path in paths:
+            from_cache = cached and not is_stream(path)
+            if instrument.enabled():
+                sentences = instrument.sentences(path, fields, from_cache)
+            elif from_cache:
+                sentences = iter(cache.load(path))
+            else:
+                sentences = read_sentences(path, fields)
+            yield path, func(sentences)
+        return
+    with Pool(jobs) as pool:
+        for result in pool.imap(_run_chunk,
+                                _tasks(paths, func, jobs, fields, cached)):
+            yield result
+
+
+def merge_counters(a, b):
+    """ Merge two chunk results: Counters (or dicts of counts) are added
+        key by key, tuples are merged element-wise. The insertion order
+        of 'a' is kept and new keys of 'b' are appended, so the result
+        is ordered as if the chunks were processed serially.
+    """
+    if isinstance(a, tuple):
+        return tuple(merge_counters(x, y) for x, y in zip(a, b))
+    merged = Counter(a)
+    merged.update(b)
+    return merged
+
+
+def add_counters(total, results):
+    """ Add all of 'results' to 'total' in place and return it; the
+        in-place, many-at-once variant of merge_counters().
+    """
+    if isinstance(total, tuple):
+        results = list(results)
+        for i, x in enumerate(total):
+            add_counters(x, [r[i] for r in results])
+        return total
+    for result in results:
+        for key, value in result.items():
+            total[key] += value
+    return total
+
+
+def map_reduce(paths, func, merge=merge_counters, jobs=1, fields=None,
+               use_cache=False):
+    """ Apply 'func' to all chunks of 'paths' and reduce the results
+        with 'merge'.
+    """
+    return reduce(merge, imap_sentences(paths, func, jobs, fields,
+                                        use_cache))
+
+
+def map_reduce_files(paths, func, merge=merge_counters, jobs=1, fields=None,
+                     use_cache=False):
+    """ As map_reduce(), but reduce the results of every file separately
+        (all files share one process pool). Return a dictionary of path
+        to result, in the order of 'paths'.
+    """
+    results = dict()
+    for path, result in imap_files(paths, func, jobs, fields, use_cache):
+        if path in results:
+            results[path] = merge(results[path], result)
+        else:
+            results[path] = result
+    return results
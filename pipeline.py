@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+""" Streaming pipelines with bounded memory.
+
+    A pipeline is a chain of iterators, each run as a stage in its own
+    thread (threaded()) or, for the expensive stages, on a pool of
+    worker processes (ordered_map()). Stages are connected by bounded
+    queues: a stage that gets ahead of the next one blocks, so the
+    memory used does not depend on the size of the input, and the
+    stages overlap (e.g. decompression, parsing and writing).
+
+    projectivized_sentences() is the pseudo-projectivization pipeline
+    of pseudo-proj.py; it can feed the projectivized sentences of a
+    treebank directly to a parser trainer:
+
+        for sent in projectivized_sentences("train.conllu.gz", jobs=4):
+            trainer.add(sent)
+"""
+
+import threading
+from collections import deque
+from functools import partial
+from itertools import islice
+from multiprocessing import Pool
+from queue import Empty, Full, Queue
+
+from conllu import Sentence, conllu_blocks
+from pseudoproj import projectivize_or_skip
+
+QUEUE_SIZE = 8  # items (batches) waiting between two stages
+BATCH = 256  # sentences per batch
+
+_END = object()
+
+
+class _Failure(object):
+    """ An exception raised in a stage, passed on to the consumer. """
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _put(queue, item, stop):
+    """ Put 'item' on 'queue', waiting while it is full; return False if
+        'stop' is set in the meantime.
+    """
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=0.1)
+            return True
+        except Full:
+            pass
+    return False
+
+
+def threaded(iterable, maxsize=QUEUE_SIZE):
+    """ Iterate over 'iterable' in a background thread that runs at most
+        'maxsize' items ahead of the consumer. Exceptions are re-raised
+        in the consumer; if the consumer stops early, the thread stops
+        too.
+    """
+    queue = Queue(maxsize)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                if not _put(queue, item, stop):
+                    return
+            _put(queue, _END, stop)
+        except BaseException as e:
+            _put(queue, _Failure(e), stop)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = queue.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        # let a producer blocked on the full queue notice the stop
+        try:
+            while True:
+                queue.get_nowait()
+        except Empty:
+            pass
+
+
+def batched(iterable, size=BATCH):
+    """ Yield lists of up to 'size' consecutive items of 'iterable'. """
+    it = iter(iterable)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def ordered_map(func, iterable, jobs, window=QUEUE_SIZE):
+    """ Yield func(x) for the items of 'iterable', in order, computed by
+        'jobs' worker processes. Unlike Pool.imap(), at most 'window'
+        items per worker are read ahead of the consumer. 'func' must be
+        picklable.
+    """
+    with Pool(jobs) as pool:
+        pending = deque()
+        for item in iterable:
+            pending.append(pool.apply_async(func, (item,)))
+            if len(pending) >= window * jobs:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def projectivize_blocks(blocks, encoding="head", everything=False):
+    """ Projectivize the sentence blocks (see conllu.conllu_blocks()) and
+        return the CoNLL-U text of the non-projective ones (or of all, if
+        'everything' is set), each followed by an empty line.
+    """
+    texts = []
+    for block in blocks:
+        sent = Sentence(instr=block, lazy=True)
+        changed = projectivize_or_skip(sent, encoding)
+        if changed or (everything and changed is not None):
+            texts.append(str(sent) + "\n")
+    return texts
+
+
+def projectivized_texts(path, encoding="head", everything=False, jobs=1,
+                        batch=BATCH, maxsize=QUEUE_SIZE):
+    """ Yield the CoNLL-U text of the projectivized sentences of 'path'
+        (see streams.open_input()). Reading runs in one thread, and
+        projectivization in another (or in 'jobs' processes); at most
+        'maxsize' batches of 'batch' sentences wait between the stages.
+    """
+    batches = threaded(batched(conllu_blocks(path), batch), maxsize)
+    func = partial(projectivize_blocks, encoding=encoding,
+                   everything=everything)
+    if jobs > 1:
+        results = ordered_map(func, batches, jobs, maxsize)
+    else:
+        results = threaded(map(func, batches), maxsize)
+    for texts in results:
+        yield from texts
+
+
+def projectivized_sentences(path, encoding="head", everything=False, jobs=1,
+                            batch=BATCH, maxsize=QUEUE_SIZE):
+    """ As projectivized_texts(), yielding conllu.Sentence objects. """
+    for text in projectivized_texts(path, encoding, everything, jobs, batch,
+                                    maxsize):
+        yield Sentence(instr=text, lazy=True)
+
+
+def write_texts(texts, fp, bufsize=1 << 20):
+    """ Write the strings in 'texts' to 'fp' in blocks of about 'bufsize'
+        characters (as conllu.write_conllu()).
+    """
+    buf = []
+    size = 0
+    for text in texts:
+        buf.append(text)
+        size += len(text)
+        if size >= bufsize:
+            fp.write("".join(buf))
+            buf = []
+            size = 0
+    if buf:
+        fp.write("".join(buf))
+    fp.flush()
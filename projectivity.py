@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+
+""" Projectivity measures on dependency trees.
+
+    All functions take the HEAD column of a sentence as a list of
+    integers, as returned by Sentence.head(): heads[i] is the head of
+    the token with id i + 1, and 0 marks the root. An arc is treated
+    as the interval between its head and its dependent; two arcs cross
+    if exactly one end point of one arc lies strictly inside the other.
+
+    By default the arcs attached to the artificial root node (HEAD 0)
+    are ignored, as in non-proj.py. Pass root=True to include them as
+    arcs starting at position 0.
+"""
+
+from conllu import TreeIndex
+
+
+def _spans(heads, root=False):
+    """ Return the arcs of the tree as (left, right, dependent) tuples.
+    """
+    spans = []
+    for dep_idx, head in enumerate(heads):
+        dep = dep_idx + 1
+        if head == 0 and not root:
+            continue
+        if head < dep:
+            spans.append((head, dep, dep))
+        else:
+            spans.append((dep, head, dep))
+    return spans
+
+
+def is_projective(heads, root=False):
+    """ Return True if no two arcs of the tree cross.
+
+        The arcs are bucketed by their left end point, longest first,
+        and pushed on a stack of right end points while scanning the
+        sentence left to right. The arcs are properly nested exactly
+        when every pushed arc ends no later than the one below it, so
+        a single linear pass suffices.
+    """
+    return _nested(_spans(heads, root), len(heads))
+
+
+def _nested(spans, n):
+    """ Return True if no two of the (left, right, _) spans over the
+        positions 0..n cross; see is_projective().
+    """
+    # counting sort on the right end point (descending), then a
+    # stable distribution on the left end point
+    by_right = [[] for _ in range(n + 1)]
+    for left, right, _ in spans:
+        by_right[right].append(left)
+    starts = [[] for _ in range(n + 1)]
+    for right in range(n, -1, -1):
+        for left in by_right[right]:
+            starts[left].append(right)
+    stack = []
+    for pos in range(n + 1):
+        while stack and stack[-1] == pos:
+            stack.pop()
+        for right in starts[pos]:
+            if stack and right > stack[-1]:
+                return False
+            stack.append(right)
+    return True
+
+
+def _range_table(values, func):
+    """ Sparse table for O(1) min/max queries over 'values'.
+    """
+    table = [values]
+    width = 1
+    while 2 * width <= len(values):
+        prev = table[-1]
+        table.append([func(prev[i], prev[i + width])
+                      for i in range(len(prev) - width)])
+        width *= 2
+    return table
+
+
+def _range_query(table, func, begin, end):
+    """ Apply 'func' over values[begin:end] (end > begin).
+    """
+    level = (end - begin).bit_length() - 1
+    row = table[level]
+    return func(row[begin], row[end - (1 << level)])
+
+
+def crossing_arcs(heads, root=False):
+    """ Return the sorted ids of the dependents whose arc crosses
+        at least one other arc.
+
+        For every position the nearest and farthest end points of the
+        arcs incident to it are recorded; an arc is crossed exactly
+        when one of the positions strictly inside it is connected to a
+        position outside it. Range minimum/maximum queries answer this
+        for each arc without comparing arcs pairwise.
+    """
+    n = len(heads)
+    spans = _spans(heads, root)
+    lo = list(range(n + 1))
+    hi = list(range(n + 1))
+    for left, right, _ in spans:
+        lo[right] = min(lo[right], left)
+        hi[left] = max(hi[left], right)
+    lo_table = _range_table(lo, min)
+    hi_table = _range_table(hi, max)
+    crossed = []
+    for left, right, dep in spans:
+        if right - left < 2:
+            continue
+        if (_range_query(lo_table, min, left + 1, right) < left or
+                _range_query(hi_table, max, left + 1, right) > right):
+            crossed.append(dep)
+    crossed.sort()
+    return crossed
+
+
+def non_projective_arcs(heads):
+    """ Return the sorted ids of the dependents whose arc is
+        non-projective, i.e. some word between the head and the
+        dependent is not dominated by the head. Arcs from the root are
+        projective.
+
+        A word inside the arc that is not dominated by the head is
+        connected to the outside by an arc crossing it, so only the
+        crossed arcs (counting the arcs from the root) are checked.
+    """
+    tree = TreeIndex(heads)
+    arcs = []
+    for dep in crossing_arcs(heads, root=True):
+        head = heads[dep - 1]
+        if head == 0:
+            continue
+        left, right = min(head, dep), max(head, dep)
+        if not all(tree.dominates(head, k) for k in range(left + 1, right)):
+            arcs.append(dep)
+    return arcs
+
+
+def crossing_pairs(heads, root=False):
+    """ Return all pairs of crossing arcs and the number of arcs crossing
+        each arc. An arc is identified by its dependent; a pair (a, b)
+        has the arc of 'a' starting to the left of that of 'b'. The
+        counts are a list indexed by token id (index 0 is unused).
+
+        The sentence is scanned left to right, keeping the arcs that
+        started before the current position and end after it in buckets
+        by their right end point, with a Fenwick tree of the bucket
+        sizes. An arc starting at the current position crosses exactly
+        the arcs in the buckets strictly inside it; the tree counts them
+        and finds the non-empty buckets in O(log n) each, so all k pairs
+        are found in O((n + k) log n) time instead of testing every pair
+        of arcs.
+    """
+    n = len(heads)
+    return _crossing_sweep(_spans(heads, root), n, n + 1)
+
+
+def _crossing_sweep(spans, n, size):
+    """ crossing_pairs() for (left, right, key) spans over the positions
+        0..n, where the keys are integers below 'size'.
+    """
+    starts = [[] for _ in range(n + 1)]
+    for left, right, key in spans:
+        starts[left].append((right, key))
+    buckets = [[] for _ in range(n + 1)]  # keys of the open arcs by right
+    tree = [0] * (n + 2)  # Fenwick tree of the bucket sizes, 1-based
+    top = 1 << (n + 1).bit_length()
+    pairs = []
+    counts = [0] * size
+    for pos in range(n + 1):
+        # the arcs ending here are closed
+        closed = len(buckets[pos])
+        i = pos + 1
+        while closed and i <= n + 1:
+            tree[i] -= closed
+            i += i & -i
+        for right, key in starts[pos]:
+            # open arcs ending before 'right' (all of them end after pos)
+            total = 0
+            i = right
+            while i:
+                total += tree[i]
+                i -= i & -i
+            counts[key] += total
+            seen = 0
+            while seen < total:
+                # the bucket of the (seen + 1)-th open arc by right end
+                i = 0
+                rest = seen
+                step = top
+                while step:
+                    if i + step <= n + 1 and tree[i + step] <= rest:
+                        i += step
+                        rest -= tree[i]
+                    step >>= 1
+                bucket = buckets[i]
+                for other in bucket:
+                    pairs.append((other, key))
+                    counts[other] += 1
+                seen += len(bucket)
+        for right, key in starts[pos]:
+            buckets[right].append(key)
+            i = right + 1
+            while i <= n + 1:
+                tree[i] += 1
+                i += i & -i
+    return pairs, counts
+
+
+def _graph_spans(graph, root=False):
+    """ Return the arcs of an EnhancedGraph as (left, right, arc number)
+        tuples over the node positions.
+    """
+    spans = []
+    for i, (head, dep) in enumerate(zip(graph.head, graph.dep)):
+        if head == 0 and not root:
+            continue
+        if head < dep:
+            spans.append((head, dep, i))
+        else:
+            spans.append((dep, head, i))
+    return spans
+
+
+def graph_is_projective(graph, root=False):
+    """ Return True if no two arcs of a conllu.EnhancedGraph cross. Nodes
+        are ordered by position (empty nodes after the word they follow);
+        a node may have several heads.
+    """
+    return _nested(_graph_spans(graph, root), len(graph))
+
+
+def graph_crossing_pairs(graph, root=False):
+    """ As crossing_pairs(), for the arcs of a conllu.EnhancedGraph: the
+        pairs and the counts refer to arc numbers (indices into
+        graph.head, graph.dep and graph.label).
+    """
+    return _crossing_sweep(_graph_spans(graph, root), len(graph),
+                           len(graph.dep))
+
+
+def gap_degrees(heads):
+    """ Return a list with the gap degree of every token, i.e. the number
+        of discontinuities in the yield (projection) of its subtree.
+        The list is indexed by token id, index 0 stands for the root.
+
+        A token's yield starts a new block at position p iff the token
+        dominates p but not p - 1, that is, iff it lies on the path from
+        p up to (but excluding) the lowest common ancestor of p - 1 and
+        p. These path increments are accumulated with one difference
+        array over the tree instead of materializing any yields; with the
+        O(1) TreeIndex.lca() this takes O(n log n) time.
+    """
+    n = len(heads)
+    tree = TreeIndex(heads)
+    blocks = [0] * (n + 1)
+    for pos in range(1, n + 1):
+        blocks[pos] += 1
+        blocks[tree.lca(pos - 1, pos)] -= 1
+    for node in reversed(tree.order):
+        blocks[heads[node - 1]] += blocks[node]
+    blocks[0] = 1
+    return [x - 1 for x in blocks]
+
+
+def gap_degree(heads):
+    """ Return the gap degree of the tree (0 for projective trees).
+    """
+    return max(gap_degrees(heads)) if heads else 0
+
+
+def edge_degree(heads):
+    """ Return the edge degree of the tree: the maximum, over all arcs,
+        of the number of connected components within the span of the
+        arc whose root is not dominated by the head of the arc.
+
+        The root of such a component lies strictly inside the span and
+        its head outside, so its arc crosses the arc (counting the arcs
+        from the root). The components are therefore counted over the
+        pairs of crossing_pairs(), with the pre-order intervals of
+        TreeIndex for the dominance tests: O((n + k) log n) for k pairs.
+    """
+    tree = TreeIndex(heads)
+    pairs, _ = crossing_pairs(heads, root=True)
+    components = [0] * (len(heads) + 1)
+    for a, b in pairs:
+        for dep, other in ((a, b), (b, a)):
+            head = heads[dep - 1]
+            if head == 0:
+                continue
+            if (min(head, dep) < other < max(head, dep) and
+                    not tree.dominates(head, other)):
+                components[dep] += 1
+    return max(components)
+
+
+def _crossing_pairs_bruteforce(heads, root=False):
+    """ crossing_pairs() by testing every pair of arcs (for checking). """
+    spans = sorted(_spans(heads, root))
+    pairs = []
+    for i, (left, right, dep) in enumerate(spans):
+        for other_left, other_right, other in spans[i + 1:]:
+            if left < other_left < right < other_right:
+                pairs.append((dep, other))
+    return pairs
+
+
+if __name__ == '__main__':
+    # Self-check: compare is_projective(), crossing_arcs() and
+    # crossing_pairs() with a pairwise crossing test on every sentence
+    # of the files given as arguments, with and without the root arcs.
+    import sys
+    from conllu import conllu_sentences
+    sents = non_proj = errors = 0
+    for path in sys.argv[1:]:
+        for s in conllu_sentences(path):
+            sents += 1
+            heads = s.head()
+            for root in (False, True):
+                expected = _crossing_pairs_bruteforce(heads, root)
+                pairs, _ = crossing_pairs(heads, root)
+                crossed = sorted(set(x for pair in expected for x in pair))
+                if (is_projective(heads, root) != (not expected) or
+                        crossing_arcs(heads, root) != crossed or
+                        sorted(pairs) != sorted(expected)):
+                    errors += 1
+                    print("MISMATCH", path, sents, "root" if root else "",
+                          file=sys.stderr)
+            if not is_projective(heads):
+                non_proj += 1
+    print(sents, "\t", non_proj, "\t", errors, "mismatch(es)")
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+""" Pseudo-projective transformation of dependency trees (Nivre and
+    Nilsson, 2005).
+
+    An arc h -> d is non-projective if a word between h and d is not
+    dominated by h. projectivize() repeatedly lifts the shortest
+    non-projective arc to the head of its head, until the tree is
+    projective, and records the lifts in the dependency labels so that
+    deprojectivize() can (approximately) undo the transformation. The
+    label encodings are:
+
+        head        d|h   lifted arc with label d whose syntactic head
+                          had the label h
+        head+path   d|h   as above, and every arc that a lift passed
+                          over gets a '%' suffix (p%)
+        path        d|    lifted arc; the arcs passed over get '%'
+
+    The functions work on the HEAD and DEPREL columns as lists (as
+    returned by Sentence.head() and Sentence.deprel()) and return new
+    lists; projectivize_sentence() and deprojectivize_sentence() update
+    a conllu.Sentence in place.
+"""
+
+import sys
+import time
+
+from conllu import TreeIndex, conllu_sentences
+from instrument import sent_id
+from projectivity import crossing_pairs, is_projective
+
+ENCODINGS = ("head", "head+path", "path")
+UP = "|"
+DOWN = "%"
+
+
+class NotATree(ValueError):
+    """ Raised by lift() if the HEAD column is not a tree. """
+
+
+def _is_projective_arc(heads, dep):
+    """ Return True if the head of 'dep' dominates all words between them.
+    """
+    head = heads[dep - 1]
+    if head == 0:
+        return True
+    lo, hi = min(head, dep), max(head, dep)
+    dominated = {head: True, 0: False}
+    for k in range(lo + 1, hi):
+        path = []
+        while k not in dominated:
+            path.append(k)
+            k = heads[k - 1]
+        result = dominated[k]
+        if not result:
+            return False
+        for x in path:
+            dominated[x] = result
+    return True
+
+
+def lift(heads):
+    """ Lift non-projective arcs, shortest first, until the tree is
+        projective. Return the new heads, a dictionary mapping the
+        lifted dependents to their original heads, and the set of words
+        whose incoming arc was passed over by a lift.
+
+        Only arcs that are crossed by another arc can be non-projective,
+        so the initial set of non-projective arcs is found among the
+        crossing arcs. Lifting d from h to the head of h only changes
+        the words dominated by h, hence after each lift only the lifted
+        arc and the other arcs from h are checked again.
+
+        A HEAD column that is not a tree raises NotATree (checked with
+        conllu.TreeIndex); lifting keeps a tree a tree, so the upward
+        walks of _is_projective_arc() always end.
+    """
+    heads = list(heads)
+    try:
+        TreeIndex(heads)
+    except ValueError as e:
+        raise NotATree(*e.args) from None
+    if is_projective(heads, root=True):
+        return heads, dict(), set()
+    n = len(heads)
+    children = [set() for _ in range(n + 1)]
+    for dep_idx, head in enumerate(heads):
+        children[head].add(dep_idx + 1)
+    _, crossings = crossing_pairs(heads, root=True)
+    nonproj = set(d for d in range(1, n + 1)
+                  if crossings[d] and not _is_projective_arc(heads, d))
+    lifted = dict()
+    passed = set()
+    while nonproj:
+        dep = min(nonproj, key=lambda d: (abs(heads[d - 1] - d), d))
+        head = heads[dep - 1]
+        lifted.setdefault(dep, head)
+        passed.add(head)
+        new_head = heads[head - 1]
+        heads[dep - 1] = new_head
+        children[head].discard(dep)
+        children[new_head].add(dep)
+        for d in list(children[head]) + [dep]:
+            if _is_projective_arc(heads, d):
+                nonproj.discard(d)
+            else:
+                nonproj.add(d)
+    return heads, lifted, passed
+
+
+def _base(label):
+    """ Return the original label of an encoded label. """
+    return label.rstrip(DOWN).split(UP, 1)[0]
+
+
+def encode(deprels, lifted, passed, encoding="head"):
+    """ Return the labels encoding the lifts returned by lift().
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError("Unknown encoding: {}".format(encoding))
+    labels = list(deprels)
+    for dep, head in lifted.items():
+        if encoding == "path":
+            labels[dep - 1] = deprels[dep - 1] + UP
+        else:
+            labels[dep - 1] = UP.join((deprels[dep - 1], deprels[head - 1]))
+    if encoding != "head":
+        for node in passed:
+            labels[node - 1] += DOWN
+    return labels
+
+
+def projectivize(heads, deprels, encoding="head"):
+    """ Return the projectivized heads and the encoded labels.
+    """
+    new_heads, lifted, passed = lift(heads)
+    return new_heads, encode(deprels, lifted, passed, encoding)
+
+
+def _find_head(heads, labels, children, start, dep, wanted, encoding):
+    """ Search the subtree of 'start' (without the subtree of 'dep') for
+        the syntactic head of 'dep', breadth-first and left to right.
+    """
+    queue = [start]
+    last = start
+    for node in queue:
+        if node != start:
+            last = node
+            if wanted and _base(labels[node - 1]) == wanted:
+                return node
+        for child in sorted(children[node]):
+            if child == dep:
+                continue
+            if encoding == "head" or labels[child - 1].endswith(DOWN):
+                queue.append(child)
+    if encoding == "head":
+        return None
+    if encoding == "path" or last != start:
+        return last
+    return None
+
+
+def deprojectivize(heads, deprels, encoding="head"):
+    """ Undo projectivize(): return the heads and labels after moving
+        every lifted arc back to the syntactic head encoded in its label.
+        The lifted arcs are processed top-down; if no suitable head is
+        found the arc stays where it is. All encodings are removed from
+        the labels.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError("Unknown encoding: {}".format(encoding))
+    heads = list(heads)
+    labels = list(deprels)
+    n = len(heads)
+    children = [set() for _ in range(n + 1)]
+    for dep_idx, head in enumerate(heads):
+        children[head].add(dep_idx + 1)
+    order = []
+    queue = [0]
+    for node in queue:
+        for child in sorted(children[node]):
+            queue.append(child)
+            if UP in labels[child - 1]:
+                order.append(child)
+    for dep in order:
+        wanted = labels[dep - 1].rstrip(DOWN).split(UP, 1)[1]
+        head = heads[dep - 1]
+        new_head = _find_head(heads, labels, children, head, dep,
+                              wanted, encoding)
+        if new_head is not None:
+            children[head].discard(dep)
+            children[new_head].add(dep)
+            heads[dep - 1] = new_head
+    return heads, [_base(x) for x in labels]
+
+
+def projectivize_sentence(sent, encoding="head"):
+    """ Projectivize a conllu.Sentence in place. Return True if it was
+        non-projective (and hence modified).
+    """
+    heads, lifted, passed = lift(sent.head())
+    if not lifted:
+        return False
+    labels = encode(sent.deprel(), lifted, passed, encoding)
+    for node, head, label in zip(sent.nodes[1:], heads, labels):
+        node.set_head(head)
+        node.deprel = label
+    return True
+
+
+def projectivize_or_skip(sent, encoding="head", log=sys.stderr):
+    """ As projectivize_sentence(), but return None (and report it on
+        'log') if the HEAD column of 'sent' is not a tree. Other errors,
+        e.g. an unknown encoding, are raised.
+    """
+    try:
+        return projectivize_sentence(sent, encoding)
+    except NotATree as e:
+        print("skipping sentence {}: {}".format(sent_id(sent) or "without "
+                                                "sent_id", e), file=log)
+        return None
+
+
+def deprojectivize_sentence(sent, encoding="head"):
+    """ Deprojectivize a conllu.Sentence in place. """
+    heads, labels = deprojectivize(sent.head(), sent.deprel(), encoding)
+    for node, head, label in zip(sent.nodes[1:], heads, labels):
+        node.set_head(head)
+        node.deprel = label
+
+
+if __name__ == '__main__':
+    # Round-trip check: projectivize and deprojectivize every sentence
+    # and count the sentences whose tree is restored exactly.
+    for encoding in ENCODINGS:
+        sents = non_proj = restored = 0
+        start = time.time()
+        for path in sys.argv[1:]:
+            for s in conllu_sentences(path):
+                sents += 1
+                heads, deprels = s.head(), s.deprel()
+                proj_heads, labels = projectivize(heads, deprels, encoding)
+                if proj_heads == heads:
+                    continue
+                non_proj += 1
+                if (heads, deprels) == deprojectivize(proj_heads, labels,
+                                                       encoding):
+                    restored += 1
+        print(encoding, "\t", sents, "\t", non_proj, "\t", restored, "\t",
+              round(restored / max(non_proj, 1) * 100, 2), "%", "\t",
+              round(time.time() - start, 2), "s")
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+
+""" Inverted index of the sentences of a treebank, for fast lookups of
+    sentences with given properties.
+
+    The index maps keys of the form FIELD=VALUE to the sorted numbers
+    (starting from 0) of the sentences in which they occur:
+
+        upos=X              a word with UPOS X
+        deprel=X            a word with DEPREL X
+        arc=H/X/D           an arc labeled X from a word with UPOS H to a
+                            word with UPOS D, e.g. arc=VERB/obj/NOUN
+        root-upos=X         the root of the sentence has UPOS X
+        nonproj             the tree is non-projective (as non-proj.py):
+                            two arcs (not from the root) cross
+        nonproj-deprel=X    an arc labeled X crosses another arc (as
+                            for nonproj, the arcs from the root are not
+                            counted)
+        order=X             word order of the root verb as in stats.py:
+                            SV, VS, OV, VO, SVO, OVS, ...
+        invalid             the HEAD column is not a tree, or has several
+                            roots (the sentence has only upos= and
+                            deprel= keys)
+
+    The postings are kept as sorted arrays, and turned into bitmaps
+    (Python integers, one bit per sentence) when queried, so that
+    queries are combined with &, |, - and ~:
+
+        index = get_index("en_pud-ud-test.conllu")
+        found = index["nonproj-deprel=acl:relcl"] & ~index["nonproj"]
+        found = index.query("root-upos=VERB order=OVS")
+        print(len(found), found.sent_ids())
+
+    In query(), terms separated by spaces must all match, 'a|b' matches
+    either a or b, and '!a' matches the sentences without a.
+
+    The index of a plain file is saved in the cache directory (see
+    cache.py) with the size and modification time of the treebank, and
+    is rebuilt when they change. File layout: a header line, the
+    sent_ids (one per line, '_' for none), the keys with the lengths of
+    their postings (one per line), followed by the raw postings.
+"""
+
+import argparse
+import os
+import sys
+from array import array
+from collections import Counter, defaultdict
+
+import cache
+from conllu import TreeIndex
+from conllu_index import IndexedCorpus
+from projectivity import crossing_arcs
+from stats import add_word_order
+from streams import is_stream
+
+MAGIC = "ud-projectivity-query-index"
+VERSION = 2
+FIELDS = ("upos", "deprel", "arc", "root-upos", "nonproj",
+          "nonproj-deprel", "order", "invalid")
+FLAGS = ("nonproj", "invalid")
+
+
+def index_file(path):
+    """ Return the name of the saved index of treebank 'path'. """
+    return os.path.splitext(cache.cache_file(path))[0] + ".query"
+
+
+def _stamp(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def sentence_keys(s, log=sys.stderr):
+    """ Return the set of index keys of sentence 's' (a conllu.Sentence
+        or a columnar.CorpusSentence). A sentence whose HEAD column is
+        not a tree (or has several roots) gets only its upos= and
+        deprel= keys and 'invalid', and is reported on 'log'.
+    """
+    heads = list(s.head())
+    upos = list(s.upos())
+    deprels = list(s.deprel())
+    keys = set()
+    for pos, deprel in zip(upos, deprels):
+        keys.add("upos=" + pos)
+        keys.add("deprel=" + deprel)
+    try:
+        keys.update(_tree_keys(s, heads, upos, deprels))
+    except (ValueError, AssertionError) as e:
+        print("sentence {}: {}; indexed as invalid".format(
+            getattr(s, 'sent_id', None) or "without sent_id", e), file=log)
+        keys.add("invalid")
+    return keys
+
+
+def _tree_keys(s, heads, upos, deprels):
+    """ The keys of sentence 's' that need a tree; see sentence_keys(). """
+    TreeIndex(heads)
+    keys = set()
+    for dep, (head, pos, deprel) in enumerate(zip(heads, upos, deprels), 1):
+        if head == 0:
+            keys.add("root-upos=" + pos)
+        else:
+            keys.add("arc={}/{}/{}".format(upos[head - 1], deprel, pos))
+    # 'nonproj' and 'nonproj-deprel' both come from the crossing arcs
+    # (without the arcs from the root), as non-proj.py
+    crossed = crossing_arcs(heads)
+    if crossed:
+        keys.add("nonproj")
+        for dep in crossed:
+            keys.add("nonproj-deprel=" + deprels[dep - 1])
+    counts, sov = Counter(), Counter()
+    add_word_order(s, counts, sov)
+    for order in ("SV", "VS", "OV", "VO"):
+        if counts[order]:
+            keys.add("order=" + order)
+    for order in sov:
+        keys.add("order=" + order)
+    return keys
+
+
+def _bitmap(numbers, size):
+    """ Return the sorted sentence 'numbers' as an integer with one bit
+        per sentence.
+    """
+    bits = bytearray((size + 7) // 8)
+    for i in numbers:
+        bits[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class Matches(object):
+    """ A set of sentences of a QueryIndex, as a bitmap. Iterating yields
+        the sentence numbers in ascending order.
+    """
+
+    __slots__ = ('index', 'bits')
+
+    def __init__(self, index, bits):
+        self.index = index
+        self.bits = bits
+
+    def __and__(self, other):
+        return Matches(self.index, self.bits & other.bits)
+
+    def __or__(self, other):
+        return Matches(self.index, self.bits | other.bits)
+
+    def __sub__(self, other):
+        return Matches(self.index, self.bits & ~other.bits)
+
+    def __invert__(self):
+        return Matches(self.index, self.index.all().bits & ~self.bits)
+
+    def __len__(self):
+        return bin(self.bits).count("1")
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __iter__(self):
+        data = self.bits.to_bytes((len(self.index) + 7) // 8, 'little')
+        for i, byte in enumerate(data):
+            while byte:
+                low = byte & -byte
+                yield i * 8 + low.bit_length() - 1
+                byte ^= low
+
+    def sent_ids(self):
+        """ Return the sent_ids of the sentences (None if there was none).
+        """
+        return [self.index.sent_ids[i] for i in self]
+
+
+class QueryIndex(object):
+    """ Postings of the keys of a treebank (see the module docstring).
+            postings - key to array('I') of sorted sentence numbers
+            sent_ids - sent_id of every sentence (None if there was none)
+    """
+
+    def __init__(self, postings, sent_ids):
+        self.postings = postings
+        self.sent_ids = sent_ids
+        self._bitmaps = dict()
+
+    @classmethod
+    def build(cls, sentences):
+        """ Index the sentences of a columnar.Corpus (or any sequence of
+            sentences).
+        """
+        postings = defaultdict(lambda: array('I'))
+        sent_ids = []
+        for number, s in enumerate(sentences):
+            sent_ids.append(getattr(s, 'sent_id', None))
+            for key in sentence_keys(s):
+                postings[key].append(number)
+        return cls(dict(postings), sent_ids)
+
+    def __len__(self):
+        return len(self.sent_ids)
+
+    def keys(self):
+        return sorted(self.postings)
+
+    def all(self):
+        """ Return the Matches of all sentences. """
+        return Matches(self, (1 << len(self)) - 1)
+
+    def __getitem__(self, key):
+        """ Return the Matches of 'key' (none if it does not occur). """
+        field = key.split("=", 1)[0]
+        if field not in FIELDS or (("=" in key) == (field in FLAGS)):
+            raise KeyError("bad query key: " + key)
+        bits = self._bitmaps.get(key)
+        if bits is None:
+            bits = _bitmap(self.postings.get(key, ()), len(self))
+            self._bitmaps[key] = bits
+        return Matches(self, bits)
+
+    def query(self, text):
+        """ Return the Matches of a query, e.g. "upos=VERB !nonproj"
+            (see the module docstring).
+        """
+        result = self.all()
+        for term in text.split():
+            negate = term.startswith("!")
+            matches = None
+            for key in term.lstrip("!").split("|"):
+                matches = self[key] if matches is None else matches | self[key]
+            result = result - matches if negate else result & matches
+        return result
+
+
+def write_index(index, path):
+    """ Save 'index' of treebank 'path', as cache.write_cache(). """
+    target = index_file(path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    size, mtime = _stamp(path)
+    keys = index.keys()
+    header = [MAGIC, VERSION, sys.byteorder, size, mtime, len(index),
+              len(keys)]
+    tmp = "{}.{}.tmp".format(target, os.getpid())
+    with open(tmp, 'wb') as fp:
+        lines = [" ".join(str(x) for x in header)]
+        lines.extend('_' if x is None else x for x in index.sent_ids)
+        lines.extend("{}\t{}".format(key, len(index.postings[key]))
+                     for key in keys)
+        lines.append("")
+        fp.write("\n".join(lines).encode('utf-8'))
+        for key in keys:
+            index.postings[key].tofile(fp)
+    os.replace(tmp, target)
+
+
+def read_index(path):
+    """ Return the saved QueryIndex of treebank 'path', or None if there
+        is none or it is out of date.
+    """
+    try:
+        fp = open(index_file(path), 'rb')
+    except OSError:
+        return None
+    with fp:
+        header = fp.readline().decode('utf-8').split()
+        if header[:2] != [MAGIC, str(VERSION)] or \
+                (int(header[3]), int(header[4])) != _stamp(path):
+            return None
+        byteorder = header[2]
+        nsent, nkeys = int(header[5]), int(header[6])
+        sent_ids = []
+        for _ in range(nsent):
+            sent_id = fp.readline().decode('utf-8').rstrip('\n')
+            sent_ids.append(None if sent_id == '_' else sent_id)
+        sizes = []
+        for _ in range(nkeys):
+            key, size = fp.readline().decode('utf-8').rstrip('\n').split('\t')
+            sizes.append((key, int(size)))
+        postings = dict()
+        for key, size in sizes:
+            numbers = array('I')
+            numbers.fromfile(fp, size)
+            if byteorder != sys.byteorder:
+                numbers.byteswap()
+            postings[key] = numbers
+    return QueryIndex(postings, sent_ids)
+
+
+def get_index(path, use_cache=True):
+    """ Return the QueryIndex of treebank 'path', from the saved index if
+        possible. Streams (see streams.is_stream()) are indexed without
+        saving the index.
+    """
+    if not use_cache or is_stream(path):
+        return QueryIndex.build(cache.load(path, use_cache=False))
+    index = read_index(path)
+    if index is None:
+        index = QueryIndex.build(cache.load(path))
+        write_index(index, path)
+    return index
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(
+        description="Find the sentences matching a query, e.g. "
+                    "'root-upos=VERB order=OVS' or 'nonproj-deprel=acl|"
+                    "nonproj-deprel=acl:relcl !upos=PROPN'.")
+    ap.add_argument('query', help="query ('' for all sentences)")
+    ap.add_argument('files', nargs='+')
+    ap.add_argument('--count', '-c', action='store_true',
+                    help="only print the number of matching sentences")
+    ap.add_argument('--conllu', action='store_true',
+                    help="print the matching sentences")
+    ap.add_argument('--keys', action='store_true',
+                    help="list the keys and their sentence counts instead")
+    ap.add_argument('--no-cache', action='store_true',
+                    help="do not read or save the index")
+    args = ap.parse_args()
+    for path in args.files:
+        assert(os.path.isfile(path) or is_stream(path)), \
+            "Error: file does not exist!"
+
+    for path in args.files:
+        index = get_index(path, not args.no_cache)
+        if args.keys:
+            for key in index.keys():
+                print(path, key, len(index.postings[key]), sep="\t")
+            continue
+        try:
+            found = index.query(args.query)
+        except KeyError as e:
+            sys.exit("Error: {}".format(e.args[0]))
+        if args.count:
+            print(path, len(found), sep="\t")
+        elif args.conllu:
+            if is_stream(path):
+                sys.exit("Error: --conllu needs a plain file")
+            with IndexedCorpus(path) as corpus:
+                for number in found:
+                    print(corpus.block(number))
+        else:
+            for number, sent_id in zip(found, found.sent_ids()):
+                print(path, number, sent_id or "_", sep="\t")
@@ -1,109 +1,175 @@
 #!/usr/bin/python3
 
+import os
 import sys
-from conllu import conllu_sentences
+import argparse
+import instrument
+from collections import Counter
+from functools import partial
+from conllu import children_index
+from parallel import map_reduce, map_reduce_files, merge_counters
 """ 1)ignore subtypes of dependencies i.e "nsubj:pass"
     2)if primary dependency relation exist, ignore others
         subject relation: nsubj(primary), csubj
-        object relation: obj(primary), ccomp, xcomp"""
+        object relation: obj(primary), ccomp, xcomp
+    The relations are given as tiers: a relation of a later tier is only
+    used if none of an earlier tier is present. By default only the root
+    (if it is a VERB) is analyzed; with predicates="verbs" every VERB is."""
+
+COUNT_KEYS = ("v_as_root", "with_s", "with_o", "with_so",
+              "SV", "VS", "OV", "VO")
+
+SUBJ_RELS = (("nsubj",), ("csubj",))
+OBJ_RELS = (("obj",), ("ccomp", "xcomp"))
+PREDICATES = ("root", "verbs")
+
+
+def parse_tiers(spec):
+    """ Parse relation tiers like "obj/ccomp,xcomp" into SUBJ_RELS form. """
+    return tuple(tuple(x.split(",")) for x in spec.split("/"))
+
+
+def select_dependent(dependents, deprel, tiers):
+    """ Return the first dependent whose relation is in the first tier
+    that occurs among 'dependents', or None.
+    """
+    for tier in tiers:
+        for dep_id in dependents:
+            if deprel(dep_id) in tier:
+                return dep_id
+    return None
+
+
+def add_word_order(s, counts, sov_collection, predicates="root",
+                   subj_rels=SUBJ_RELS, obj_rels=OBJ_RELS):
+    """ Add the word order statistics of sentence 's' to the Counters
+    'counts' and 'sov_collection' (see word_order()). The dependents of
+    the predicates are looked up in a children index built once.
+    """
+    children = children_index(s.head())
+    # check if there is more than one root, just in case.
+    assert(len(children[0]) == 1), "Error: more than one root found!"
+
+    if predicates == "root":
+        verbs = [v for v in children[0] if s.upos(v) == "VERB"]
+    else:
+        verbs = [v for v, upos in enumerate(s.upos(), 1) if upos == "VERB"]
+    for verb_id in verbs:
+        counts["v_as_root"] += 1
+        subj_id = select_dependent(children[verb_id], s.deprel, subj_rels)
+        obj_id = select_dependent(children[verb_id], s.deprel, obj_rels)
+
+        if subj_id is not None:
+            counts["with_s"] += 1
+            # s v order
+            counts["SV" if subj_id < verb_id else "VS"] += 1
+        if obj_id is not None:
+            counts["with_o"] += 1
+            # o v order
+            counts["OV" if obj_id < verb_id else "VO"] += 1
+        if subj_id is not None and obj_id is not None:
+            counts["with_so"] += 1
+            # s o v order
+            order = [(subj_id, "S"), (obj_id, "O"), (verb_id, "V")]
+            order.sort()
+            sov_order = "".join([x[1] for x in order])
+            sov_collection[sov_order] += 1
+
+
+def word_order(sentences, predicates="root", subj_rels=SUBJ_RELS,
+               obj_rels=OBJ_RELS):
+    """ Collect word order statistics of the VERB predicates (the root
+    only, by default). Return a pair of Counters: the tallies (keyed by
+    COUNT_KEYS) and the S/O/V orders, in the order they were first seen.
+    """
+    counts = Counter({k: 0 for k in COUNT_KEYS})
+    sov_collection = Counter()
+    for s in sentences:
+        add_word_order(s, counts, sov_collection, predicates,
+                       subj_rels, obj_rels)
+    return counts, sov_collection
+
+
+def print_word_order(counts, sov_collection, out=sys.stdout):
+    with_s, with_o, with_so = counts["with_s"], counts["with_o"], counts["with_so"]
+    for sov_order in sov_collection.keys():
+        print(sov_order, "\t", sov_collection[sov_order], "\t", round(sov_collection[sov_order]/with_so * 100, 2), "%", file=out)
+
+    for key, total in (("SV", with_s), ("VS", with_s),
+                       ("OV", with_o), ("VO", with_o)):
+        if counts[key] != 0:
+            print(key, "\t", counts[key], "\t", round(counts[key] / total * 100, 2), "%", file=out)
+
+
+SOV_ORDERS = ("SOV", "SVO", "VSO", "VOS", "OVS", "OSV")
+
+
+def language(path):
+    """ Language code of a UD treebank file, e.g. 'en' for
+    en_pud-ud-test.conllu.
+    """
+    return os.path.basename(path).split("_")[0].split(".")[0]
+
+
+def percent(count, total):
+    return round(count / total * 100, 2) if total else 0.0
+
+
+def print_word_order_table(groups, out=sys.stdout):
+    """ Print one TSV row of word order percentages per group; 'groups'
+    maps a group name to a (counts, sov_collection) pair.
+    """
+    print("\t".join(("group", "verbs", "with_s", "with_o", "with_so") +
+                    SOV_ORDERS + ("SV", "VS", "OV", "VO")), file=out)
+    for name, (counts, sov_collection) in groups.items():
+        row = [name] + [counts[k] for k in
+                        ("v_as_root", "with_s", "with_o", "with_so")]
+        row.extend(percent(sov_collection[x], counts["with_so"])
+                   for x in SOV_ORDERS)
+        row.extend(percent(counts[x], counts["with_s"]) for x in ("SV", "VS"))
+        row.extend(percent(counts[x], counts["with_o"]) for x in ("OV", "VO"))
+        print("\t".join(str(x) for x in row), file=out)
+
+
 if __name__ == '__main__':
-    #initialize variables
-    v_as_root, with_s, with_o, with_so, sv, vs, ov, vo = (0,) * 8
-    sov_collection = dict()
+    ap = argparse.ArgumentParser()
+    ap.add_argument('files', nargs='+')
+    ap.add_argument('--jobs', '-j', type=int, default=1,
+                    help="number of worker processes")
+    ap.add_argument('--no-cache', action='store_true',
+                    help="parse the files instead of using the binary cache")
+    ap.add_argument('--predicates', choices=PREDICATES, default="root",
+                    help="analyze the root verb only, or every VERB")
+    ap.add_argument('--subj', default="nsubj/csubj",
+                    help="subject relations, tiers separated by '/'")
+    ap.add_argument('--obj', default="obj/ccomp,xcomp",
+                    help="object relations, tiers separated by '/'")
+    ap.add_argument('--by', choices=("file", "language"),
+                    help="print a table with one row per file or language")
+    instrument.add_arguments(ap)
+    args = ap.parse_args()
+    instrument.setup(args)
     #check file name
-    assert(".conllu" in sys.argv[1]), "Incorrect file! Please use a .conllu file."
-
-    for s in conllu_sentences(sys.argv[1]):
-        # check if there is more than one root, just in case.
-        root_indices = [i for i, x in enumerate(s.head()) if x == 0]
-        assert(len(root_indices) == 1), "Error: more than one root found!"
-
-        root_index = s.head().index(0)
-        root_id = root_index + 1
-        root_upos = s.upos(root_id) # find upos of index
-        if root_upos == "VERB":
-            v_as_root += 1
-            # find the direct dependency
-            # list of direct dependencies' id
-            dep_ids = [i + 1 for i, head_id in enumerate(s.head()) if
-                       head_id == root_id]
-            # list of dependency relations, plus id information
-            dep_rel = []
-            dep_rel_id = []
-
-            for dep_id in dep_ids:
-                dep_rel.append(s.deprel(dep_id))
-                dep_rel_id.append((s.deprel(dep_id), dep_id))  # tuple:(relation, id)
-
-            #initialize variables
-            subj_id = None
-            obj_id = None
-
-            #primary relation
-            if "nsubj" in dep_rel:#there is primary tag
-                subj_id = -1
-            if "obj" in dep_rel:
-                obj_id = -1
-            #find subj_id and obj_id if there is one.
-            for (rel, rel_id) in dep_rel_id:
-                """rel = dep_pair[0]
-                rel_id = dep_pair[1]"""
-                #subject
-                if subj_id == -1:
-                    if rel == "nsubj":  # if primary relation is present, then no need to check for other relations
-                        subj_id = rel_id
-                elif subj_id is None:
-                    if rel == "csubj":
-                        subj_id = rel_id
-                #object
-                if obj_id == -1:
-                    if rel == "obj":  # if primary relation is present, then no need to check for other relations
-                        obj_id = rel_id
-                elif obj_id is None:
-                    if rel == "ccomp":
-                        obj_id = rel_id
-                    elif rel == "xcomp":
-                        obj_id = rel_id
-
-
-            if subj_id is not None:
-                with_s += 1
-                # s v order
-                if subj_id < root_id:
-                    sv += 1
-                elif subj_id > root_id:
-                    vs += 1
-                else:#just in case
-                    raise Exception("Duplicate id found!")
-            if obj_id is not None:
-                with_o += 1
-                # o v order
-                if obj_id < root_id:
-                    ov += 1
-                elif obj_id > root_id:
-                    vo += 1
-                else:#just in case
-                    raise Exception("Duplicate id found!")
-            if subj_id is not None and obj_id is not None:
-                with_so += 1
-                # s o v order
-                list = [(subj_id, "S"), (obj_id, "O"), (root_id, "V")]
-                list.sort()
-                sov_order = "".join([x[1] for x in list])
-                if sov_order not in sov_collection.keys():
-                    sov_collection[sov_order] = 1
-                else:
-                    sov_collection[sov_order] += 1
-
-    # <Print out the results>
-    for sov_order in sov_collection.keys():
-        print(sov_order, "\t", sov_collection[sov_order], "\t", round(sov_collection[sov_order]/with_so * 100, 2), "%")
-
-    if sv != 0:
-        print("SV", "\t", sv, "\t", round(sv / with_s * 100, 2), "%")
-    if vs != 0:
-        print("VS", "\t", vs, "\t", round(vs / with_s * 100, 2), "%")
-    if ov != 0:
-        print("OV", "\t", ov, "\t", round(ov / with_o * 100, 2), "%")
-    if vo != 0:
-        print("VO", "\t", vo, "\t", round(vo / with_o * 100, 2), "%")
\ No newline at end of file
+    for f in args.files:
+        assert(".conllu" in f or f == "-"), "Incorrect file! Please use a .conllu file."
+
+    func = partial(word_order, predicates=args.predicates,
+                   subj_rels=parse_tiers(args.subj),
+                   obj_rels=parse_tiers(args.obj))
+    fields = ('head', 'deprel', 'upos')
+    if args.by is None:
+        counts, sov_collection = map_reduce(args.files, func, jobs=args.jobs,
+                                            fields=fields,
+                                            use_cache=not args.no_cache)
+        # <Print out the results>
+        print_word_order(counts, sov_collection)
+    else:
+        results = map_reduce_files(args.files, func, jobs=args.jobs,
+                                   fields=fields, use_cache=not args.no_cache)
+        groups = dict()
+        for path, result in results.items():
+            name = path if args.by == "file" else language(path)
+            if name in groups:
+                result = merge_counters(groups[name], result)
+            groups[name] = result
+        print_word_order_table(groups)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+""" Opening treebanks that are not plain files: standard input ('-') and
+    files compressed with gzip (.gz), bzip2 (.bz2) or xz (.xz).
+
+    Such inputs are read (and decompressed) by a background thread that
+    stays a few blocks ahead of the reader, so that decompression
+    overlaps with parsing; the decompressors release the GIL while they
+    work. Streams cannot be split into chunks by byte offset or cached,
+    so parallel.py and cache.py treat them differently from plain files
+    (see is_stream()).
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import sys
+import threading
+from queue import Queue
+
+STDIN = "-"
+COMPRESSED = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+BLOCK_SIZE = 1 << 16
+READ_AHEAD = 16
+
+
+def compression(path):
+    """ Return the compressed file suffix of 'path', or None. """
+    ext = os.path.splitext(path)[1]
+    return ext if ext in COMPRESSED else None
+
+
+def is_stream(path):
+    """ True if 'path' is standard input or a compressed file. """
+    return path == STDIN or compression(path) is not None
+
+
+class ReadAhead(io.RawIOBase):
+    """ Binary reader that reads 'raw' in a background thread, keeping
+        up to 'depth' blocks of 'block_size' bytes in a queue. Errors of
+        the reading thread are raised by the next read. 'raw' is closed
+        with the reader if 'close_raw' is set.
+    """
+
+    def __init__(self, raw, block_size=BLOCK_SIZE, depth=READ_AHEAD,
+                 close_raw=True):
+        self.raw = raw
+        self.close_raw = close_raw
+        self._block_size = block_size
+        self._queue = Queue(depth)
+        self._buf = b""
+        self._pos = 0
+        self._eof = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _fill(self):
+        try:
+            while not self._stop.is_set():
+                data = self.raw.read(self._block_size)
+                self._queue.put(data)
+                if not data:
+                    break
+        except Exception as e:
+            self._queue.put(e)
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self._pos == len(self._buf):
+            if self._eof:
+                return 0
+            data = self._queue.get()
+            if isinstance(data, Exception):
+                self._eof = True
+                raise data
+            if not data:
+                self._eof = True
+                return 0
+            self._buf, self._pos = data, 0
+        n = min(len(b), len(self._buf) - self._pos)
+        b[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._stop.set()
+            # a reading thread blocked on the full queue can now put its
+            # last block and stop
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            if self.close_raw:
+                self._thread.join()
+                self.raw.close()
+        super().close()
+
+
+def open_input(path, readahead=True, encoding='utf-8'):
+    """ Open a treebank for reading as text: a plain file, standard
+        input ('-') or a compressed file. Streams are read ahead in a
+        background thread unless 'readahead' is False.
+    """
+    if path == STDIN:
+        # do not close standard input with the returned file
+        raw = open(sys.stdin.fileno(), 'rb', closefd=False)
+        close_raw = False
+    elif compression(path) is not None:
+        raw = COMPRESSED[compression(path)](path, 'rb')
+        close_raw = True
+    else:
+        return open(path, 'r', encoding=encoding)
+    if readahead:
+        raw = io.BufferedReader(ReadAhead(raw, close_raw=close_raw))
+    return io.TextIOWrapper(raw, encoding=encoding)
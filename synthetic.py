@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+""" Random CoNLL-U treebanks for testing and benchmarking.
+
+    generate() yields the text of random sentences; the output only
+    depends on the seed and the parameters. Trees are built projective
+    (every word heads a contiguous span), and a 'non_proj' fraction of
+    them is then made non-projective by re-attaching a word to a head
+    outside its span. Optionally, words are grouped into multi-word
+    tokens and empty nodes (with enhanced dependencies) are added.
+
+        python3 synthetic.py --sentences 10000 --length 30 --seed 1 > x.conllu
+"""
+
+import argparse
+import random
+import sys
+
+from projectivity import is_projective
+
+UPOS = ("NOUN", "VERB", "ADJ", "ADV", "ADP", "DET", "PRON", "PROPN",
+        "AUX", "CCONJ", "PUNCT", "NUM")
+DEPRELS = ("nsubj", "obj", "obl", "advmod", "amod", "det", "case",
+           "nmod", "conj", "cc", "punct", "aux", "mark", "compound")
+FEATS = ("_", "Number=Sing", "Number=Plur", "Case=Nom|Number=Sing",
+         "Mood=Ind|Tense=Past|VerbForm=Fin")
+
+
+def projective_heads(n, rng):
+    """ Return the HEAD column of a random projective tree of n words. """
+    heads = [0] * n
+    stack = [(1, n, 0)]  # span of words [lo, hi] attached to 'head'
+    while stack:
+        lo, hi, head = stack.pop()
+        word = rng.randint(lo, hi)
+        heads[word - 1] = head
+        if lo < word:
+            stack.append((lo, word - 1, word))
+        if word < hi:
+            stack.append((word + 1, hi, word))
+    return heads
+
+
+def _subtree(heads, word):
+    """ Return the set of words dominated by 'word' (including itself). """
+    children = [[] for _ in range(len(heads) + 1)]
+    for dep, head in enumerate(heads, 1):
+        children[head].append(dep)
+    nodes = [word]
+    for node in nodes:
+        nodes.extend(children[node])
+    return set(nodes)
+
+
+def make_non_projective(heads, rng, tries=20):
+    """ Re-attach a random word so that the tree is no longer projective
+        (arcs from the root are not considered). Return the new heads,
+        or None if no suitable word was found.
+    """
+    n = len(heads)
+    for _ in range(tries):
+        word = rng.randint(1, n)
+        if heads[word - 1] == 0:
+            continue
+        below = _subtree(heads, word)
+        candidates = [h for h in range(1, n + 1) if h not in below]
+        if not candidates:
+            continue
+        new = list(heads)
+        new[word - 1] = rng.choice(candidates)
+        if not is_projective(new):
+            return new
+    return None
+
+
+def sentence(number, n, rng, non_proj=0.0, multiword=0.0, empty=0.0):
+    """ Return the CoNLL-U text of a random sentence of n words. """
+    heads = projective_heads(n, rng)
+    if n > 3 and rng.random() < non_proj:
+        heads = make_non_projective(heads, rng) or heads
+    lines = ["# sent_id = s{}".format(number),
+             "# text = " + " ".join("w{}".format(i) for i in range(1, n + 1))]
+    i = 1
+    while i <= n:
+        span = 2 if i < n and rng.random() < multiword else 1
+        if span == 2:
+            lines.append("{}-{}\tm{}\t_\t_\t_\t_\t_\t_\t_\t_".format(i, i + 1, i))
+        for j in range(i, i + span):
+            head = heads[j - 1]
+            if head == 0:
+                upos, deprel = "VERB", "root"
+            else:
+                upos, deprel = rng.choice(UPOS), rng.choice(DEPRELS)
+            lines.append("\t".join((str(j), "w{}".format(j), "l{}".format(j),
+                                    upos, "_", rng.choice(FEATS), str(head),
+                                    deprel, "{}:{}".format(head, deprel), "_")))
+            if rng.random() < empty:
+                lines.append("{}.1\te{}\te{}\tVERB\t_\t_\t_\t_\t{}:conj\t_"
+                             .format(j, j, j, j))
+        i += span
+    return "\n".join(lines) + "\n"
+
+
+def generate(sentences=1000, length=20, seed=0, non_proj=0.1,
+             multiword=0.0, empty=0.0):
+    """ Yield the text of random sentences; the lengths are drawn from a
+        geometric-like distribution with mean about 'length'.
+    """
+    rng = random.Random(seed)
+    for number in range(1, sentences + 1):
+        n = max(1, min(int(rng.expovariate(1 / length)) + 1, 10 * length))
+        yield sentence(number, n, rng, non_proj, multiword, empty)
+
+
+def write(f, **params):
+    """ Write a random treebank to file 'f' (a path or file object);
+        the keyword arguments are those of generate().
+    """
+    fp = open(f, 'w') if isinstance(f, str) else f
+    for text in generate(**params):
+        fp.write(text)
+        fp.write("\n")
+    if isinstance(f, str):
+        fp.close()
+
+
+def add_arguments(ap):
+    """ Add the generate() parameters as options to argument parser 'ap'.
+    """
+    ap.add_argument('--sentences', '-n', type=int, default=1000)
+    ap.add_argument('--length', '-l', type=int, default=20,
+                    help="mean sentence length")
+    ap.add_argument('--seed', '-s', type=int, default=0)
+    ap.add_argument('--non-proj', type=float, default=0.1,
+                    help="fraction of non-projective sentences")
+    ap.add_argument('--multiword', type=float, default=0.0,
+                    help="probability of a multi-word token at a word")
+    ap.add_argument('--empty', type=float, default=0.0,
+                    help="probability of an empty node after a word")
+
+
+def parameters(args):
+    return dict(sentences=args.sentences, length=args.length,
+                seed=args.seed, non_proj=args.non_proj,
+                multiword=args.multiword, empty=args.empty)
+
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser()
+    add_arguments(ap)
+    args = ap.parse_args()
+    write(sys.stdout, **parameters(args))
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+""" Whole-corpus tree statistics with NumPy.
+
+    The functions here work on a columnar.Corpus and compute their
+    results for all sentences at once with array operations, instead of
+    looping over the sentences in Python. Results are either one value
+    per sentence or one value per word, aligned with corpus.head.
+
+    This module needs NumPy, which is not required by the rest of the
+    programs.
+"""
+
+import numpy as np
+
+
+def _column(values):
+    """ Zero-copy NumPy view of an array.array column.
+    """
+    return np.frombuffer(values, dtype=np.dtype(values.typecode))
+
+
+def token_index(corpus):
+    """ Return two arrays with the sentence number and the word index
+        (starting from 1) of every word in the corpus.
+    """
+    offsets = _column(corpus.offsets)
+    lengths = np.diff(offsets)
+    sentence = np.repeat(np.arange(len(lengths)), lengths)
+    index = np.arange(len(corpus.head)) - offsets[sentence] + 1
+    return sentence, index
+
+
+def arc_lengths(corpus):
+    """ Return the distance between every word and its head (0 for the
+        words attached to the root).
+    """
+    heads = _column(corpus.head)
+    _, index = token_index(corpus)
+    return np.where(heads == 0, 0, np.abs(heads - index))
+
+
+def depths(corpus):
+    """ Return the depth of every word: 1 for the root word, 2 for its
+        dependents and so on (as head_distance() in pseudo-proj.py).
+
+        Depths are computed by pointer jumping: every word repeatedly
+        adds the depth accumulated by its current ancestor and jumps to
+        that ancestor's ancestor, so the number of passes is logarithmic
+        in the depth of the deepest tree. Raise ValueError if the HEAD
+        column contains a cycle.
+    """
+    heads = _column(corpus.head).astype(np.int64)
+    offsets = _column(corpus.offsets)
+    sentence, _ = token_index(corpus)
+    jump = np.where(heads == 0, -1, offsets[sentence] + heads - 1)
+    depth = np.ones(len(heads), dtype=np.int64)
+    for _ in range(max(1, len(heads)).bit_length() + 1):
+        active = np.flatnonzero(jump >= 0)
+        if len(active) == 0:
+            return depth
+        ancestor = jump[active]
+        depth[active] += depth[ancestor]
+        jump[active] = jump[ancestor]
+    raise ValueError("HEAD column does not form a tree")
+
+
+def crossings(corpus, root=False, max_cells=1 << 22):
+    """ Count crossing arcs in all sentences. Return a pair of arrays:
+        the number of crossing arc pairs in every sentence, and the
+        number of arcs crossing the arc of every word.
+
+        Sentences are processed in batches of similar length, comparing
+        all pairs of arcs in the batch with one broadcast operation;
+        'max_cells' bounds the size of the (sentences x words x words)
+        comparison arrays. As in projectivity.py, the arcs from the root
+        are only taken into account if 'root' is True.
+    """
+    heads = _column(corpus.head)
+    offsets = _column(corpus.offsets)
+    lengths = np.diff(offsets)
+    _, index = token_index(corpus)
+    is_root = heads == 0
+    left = np.minimum(heads, index)
+    right = np.maximum(heads, index)
+    if not root:
+        # empty intervals never cross anything
+        left = np.where(is_root, -1, left)
+        right = np.where(is_root, -1, right)
+
+    pairs = np.zeros(len(lengths), dtype=np.int64)
+    per_arc = np.zeros(len(heads), dtype=np.int64)
+    order = np.argsort(lengths, kind='stable')
+    start = np.searchsorted(lengths[order], 2)  # need two arcs to cross
+    while start < len(order):
+        size = lengths[order[start]]
+        end = min(len(order), start + max(1, max_cells // (size * size)))
+        size = lengths[order[end - 1]]
+        while end - start > 1 and (end - start) * size * size > max_cells:
+            end = start + max(1, max_cells // (size * size))
+            size = lengths[order[end - 1]]
+        batch = order[start:end]
+        positions = np.arange(size)
+        valid = positions < lengths[batch][:, None]
+        words = np.where(valid, offsets[batch][:, None] + positions, 0)
+        l = np.where(valid, left[words], -1)
+        r = np.where(valid, right[words], -1)
+        # cross[s, a, b]: arc a starts before arc b and ends inside it
+        cross = ((l[:, :, None] < l[:, None, :]) &
+                 (l[:, None, :] < r[:, :, None]) &
+                 (r[:, :, None] < r[:, None, :]))
+        pairs[batch] = cross.sum(axis=(1, 2))
+        per_arc[words[valid]] = (cross.sum(axis=2) + cross.sum(axis=1))[valid]
+        start = end
+    return pairs, per_arc
+
+
+def non_projective(corpus, root=False):
+    """ Return a boolean array flagging the non-projective sentences.
+    """
+    pairs, _ = crossings(corpus, root)
+    return pairs > 0